@@ -0,0 +1,210 @@
+"""Batch encode/decode of many documents on a bounded process pool.
+
+    python batch_runner.py encode docs/ -o videos/ --jobs 8 --profile hd
+    python batch_runner.py decode videos/ -o decoded/
+    python batch_runner.py manifest jobs.jsonl --summary results.json
+
+A manifest is a JSON-lines file with one job per line:
+
+    {"op": "encode", "input": "a.txt", "output": "a.mp4", "profile": "hd", "fec": true, "compress": "zlib", "encrypt": true,
+     "codec": "h264", "speed": "ultrafast"}
+    {"op": "decode", "input": "a.mp4", "output": "a.txt"}
+
+Every job gets its own output path, so jobs never overwrite each other. A JSON
+summary with per-job timings and throughput is written at the end. Jobs with
+"encrypt": true, and decodes of encrypted videos, take the password from
+$TEXT_VIDEO_PASSWORD.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import decoder_core
+import encoder_core
+import encryption
+import text_video
+from compression import CODECS
+from frame_profile import DEFAULT_PROFILE, PROFILES
+from video_codecs import DEFAULT_CODEC, VIDEO_CODECS, output_path_for
+
+DEFAULT_SUMMARY = 'batch_summary.json'
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.npy')
+
+
+def run_job(job):
+    """Runs one encode or decode job and returns its result record.
+
+    Top-level so it can run in a worker process. Each job runs its pipeline with a
+    single worker; the parallelism comes from running jobs side by side.
+    """
+    encoder_core.status_callback = None
+    decoder_core.status_callback = None
+    result = dict(job, status='ok', error=None)
+    started = time.perf_counter()
+    try:
+        output_dir = os.path.dirname(job["output"])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        password = os.environ.get(encryption.PASSWORD_ENV)
+        if job["op"] == 'encode':
+            if job.get("encrypt") and not password:
+                raise ValueError(f"Encrypting needs a password in ${encryption.PASSWORD_ENV}")
+            # step5 may change the extension to suit the codec
+            result["output"] = text_video.encode(
+                job["input"], job["output"], job.get("profile", DEFAULT_PROFILE), num_workers=1,
+                error_correction=job.get("fec", False), compress=job.get("compress"),
+                password=password if job.get("encrypt") else None, codec=job.get("codec", DEFAULT_CODEC),
+                writer_options={"speed": job.get("speed"), "gop_size": job.get("gop_size")})
+            result["payload_bytes"] = os.path.getsize(job["input"])
+        elif job["op"] == 'decode':
+            data = text_video.decode(job["input"], num_workers=1, password=password)
+            with open(job["output"], 'wb') as f_out:
+                f_out.write(data)
+            result["payload_bytes"] = len(data)
+        else:
+            raise ValueError(f"Unknown op '{job['op']}' (expected 'encode' or 'decode')")
+        result["output_bytes"] = os.path.getsize(result["output"])
+    except Exception as e:
+        result["status"] = 'error'
+        result["error"] = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - started
+    result["seconds"] = round(seconds, 4)
+    if result["status"] == 'ok' and seconds > 0:
+        result["payload_bytes_per_sec"] = round(result["payload_bytes"] / seconds, 1)
+    return result
+
+
+def jobs_from_directory(op, input_dir, output_dir, profile=DEFAULT_PROFILE, error_correction=False, compress=None,
+                        encrypt=False, codec=DEFAULT_CODEC):
+    """Builds one job per file in input_dir: text files -> .mp4 for encode, videos -> .txt for decode."""
+    jobs = []
+    for name in sorted(os.listdir(input_dir)):
+        input_path = os.path.join(input_dir, name)
+        if not os.path.isfile(input_path):
+            continue
+        stem, extension = os.path.splitext(name)
+        if op == 'encode':
+            output_path = output_path_for(os.path.join(output_dir, stem + '.mp4'), codec)
+            jobs.append({"op": op, "input": input_path, "output": output_path, "profile": profile,
+                         "fec": error_correction, "compress": compress, "encrypt": encrypt, "codec": codec})
+        elif extension.lower() in VIDEO_EXTENSIONS:
+            jobs.append({"op": op, "input": input_path, "output": os.path.join(output_dir, stem + '.txt')})
+    return jobs
+
+
+def jobs_from_manifest(manifest_path):
+    """Reads a JSON-lines manifest; blank lines and lines starting with # are skipped.
+
+    Encode outputs get the extension their codec will be written with (see
+    output_path_for), so run_batch can tell when two jobs would write one file.
+    """
+    jobs = []
+    with open(manifest_path, 'r', encoding='utf-8') as manifest:
+        for line_number, line in enumerate(manifest, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            job = json.loads(line)
+            missing = {"op", "input", "output"} - job.keys()
+            if missing:
+                raise ValueError(f"{manifest_path}:{line_number}: job is missing {', '.join(sorted(missing))}")
+            if job["op"] == 'encode':
+                try:
+                    job["output"] = output_path_for(job["output"], job.get("codec", DEFAULT_CODEC))
+                except ValueError as e:
+                    raise ValueError(f"{manifest_path}:{line_number}: {e}")
+            jobs.append(job)
+    return jobs
+
+
+def run_batch(jobs, max_jobs=None, progress_callback=None):
+    """Runs the jobs on a process pool of at most max_jobs workers (default: one per
+    CPU core) and returns the summary dict. progress_callback, if given, is called
+    with each result as it finishes."""
+    max_jobs = max_jobs or os.cpu_count() or 1
+    outputs = [job["output"] for job in jobs]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("Two or more jobs write to the same output path")
+
+    started = time.perf_counter()
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=max_jobs) as executor:
+        futures = {executor.submit(run_job, job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if progress_callback:
+                progress_callback(result)
+    wall_seconds = time.perf_counter() - started
+
+    succeeded = [result for result in results if result["status"] == 'ok']
+    total_payload_bytes = sum(result["payload_bytes"] for result in succeeded)
+    return {
+        "jobs": len(jobs),
+        "succeeded": len(succeeded),
+        "failed": len(jobs) - len(succeeded),
+        "max_jobs": max_jobs,
+        "wall_seconds": round(wall_seconds, 4),
+        "total_payload_bytes": total_payload_bytes,
+        "payload_bytes_per_sec": round(total_payload_bytes / wall_seconds, 1) if wall_seconds > 0 else None,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode or decode many files on a bounded process pool.")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="concurrent jobs (default: one per CPU core)")
+    parser.add_argument('--summary', default=DEFAULT_SUMMARY, help="where to write the JSON results summary")
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't print per-job lines to stderr")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for op in ('encode', 'decode'):
+        op_parser = subparsers.add_parser(op, help=f"{op} every file in a directory")
+        op_parser.add_argument('input_dir')
+        op_parser.add_argument('-o', '--output-dir', required=True)
+        if op == 'encode':
+            op_parser.add_argument('-p', '--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES))
+            op_parser.add_argument('--fec', action='store_true', help="add interleaved error correction")
+            op_parser.add_argument('--compress', choices=sorted(CODECS), default=None, help="compress inputs first")
+            op_parser.add_argument('--encrypt', action='store_true',
+                                   help=f"encrypt with the password in ${encryption.PASSWORD_ENV}")
+            op_parser.add_argument('-c', '--codec', default=DEFAULT_CODEC, choices=sorted(VIDEO_CODECS))
+    manifest_parser = subparsers.add_parser('manifest', help="run the jobs listed in a JSON-lines manifest")
+    manifest_parser.add_argument('manifest')
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == 'manifest':
+            jobs = jobs_from_manifest(args.manifest)
+        else:
+            jobs = jobs_from_directory(args.command, args.input_dir, args.output_dir,
+                                       getattr(args, 'profile', DEFAULT_PROFILE), getattr(args, 'fec', False),
+                                       getattr(args, 'compress', None), getattr(args, 'encrypt', False),
+                                       getattr(args, 'codec', DEFAULT_CODEC))
+        if not jobs:
+            print("error: no jobs to run", file=sys.stderr)
+            return 1
+
+        def print_result(result):
+            if result["status"] == 'ok':
+                print(f"[ok] {result['op']} {result['input']} -> {result['output']} ({result['seconds']}s)", file=sys.stderr)
+            else:
+                print(f"[error] {result['op']} {result['input']}: {result['error']}", file=sys.stderr)
+
+        summary = run_batch(jobs, args.jobs, None if args.quiet else print_result)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    with open(args.summary, 'w', encoding='utf-8') as f_out:
+        json.dump(summary, f_out, indent=2)
+    if not args.quiet:
+        print(f"{summary['succeeded']}/{summary['jobs']} jobs succeeded in {summary['wall_seconds']}s; "
+              f"summary written to {args.summary}", file=sys.stderr)
+    return 0 if summary["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
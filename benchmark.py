@@ -0,0 +1,211 @@
+"""Encode/decode throughput benchmark on synthetic payloads.
+
+    python benchmark.py
+    python benchmark.py --sizes 1K,100K,10M --profiles hd,hd_gray --codec ffv1
+    python benchmark.py --sizes 1K,10K --profiles classic --payload text --compress zlib -o before.json
+    python benchmark.py --sizes 1M --encrypt --fec
+
+Every (profile, size) case runs the encoder pipeline (step2 -> step5) and the decoder
+pipeline (step8 -> step10) headlessly in a fresh process, checks that the payload
+comes back intact and records per-stage seconds, bits/sec, frames/sec, peak RSS and
+the video size. Results are printed as a table and written as JSON so runs can be
+compared. step4 hands frames straight to step5, so their time is reported together.
+"""
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import decoder_core
+import encoder_core
+from compression import CODECS
+from frame_profile import PROFILES
+from video_codecs import DEFAULT_CODEC, VIDEO_CODECS
+
+DEFAULT_SIZES = "1K,10K,100K,1M,10M,100M"
+DEFAULT_PROFILES = "hd"
+DEFAULT_RESULTS = 'benchmark_results.json'
+SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+LOG_LINE = b'{"level": "INFO", "path": "/api/items", "status": 200, "msg": "request served"}\n'
+BENCHMARK_PASSWORD = "benchmark" # Used by --encrypt; the key derivation cost is part of what is measured
+
+
+def parse_size(text):
+    """Parses "100", "10K" or "1M" into a byte count."""
+    text = text.strip().upper()
+    multiplier = SIZE_SUFFIXES.get(text[-1:], 1)
+    return int(text[:-1] if multiplier > 1 else text) * multiplier
+
+
+def write_payload(path, size, kind, seed=0):
+    """Writes size bytes of synthetic payload: 'random' bytes or repetitive 'text' log lines."""
+    rng = np.random.default_rng(seed)
+    chunk_size = 1 << 20
+    with open(path, 'wb') as f_out:
+        for start in range(0, size, chunk_size):
+            length = min(chunk_size, size - start)
+            if kind == 'text':
+                f_out.write((LOG_LINE * (length // len(LOG_LINE) + 1))[:length])
+            else:
+                f_out.write(rng.integers(0, 256, length, dtype=np.uint8).tobytes())
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its finished children, in MiB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1 if sys.platform == 'darwin' else 1024 # ru_maxrss is bytes on macOS, KiB on Linux
+    return round(own * scale / (1 << 20), 1), round(children * scale / (1 << 20), 1)
+
+
+class StageTimer:
+    """Records the seconds and the peak RSS so far after each timed stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        self.stages[name] = {"seconds": round(time.perf_counter() - started, 4), "peak_rss_mb": peak_rss_mb()[0]}
+        return result
+
+    def total_seconds(self):
+        return sum(stage["seconds"] for stage in self.stages.values())
+
+
+def rates(payload_bytes, num_frames, seconds):
+    if seconds <= 0:
+        return {"bits_per_sec": None, "frames_per_sec": None}
+    return {"bits_per_sec": round(payload_bytes * 8 / seconds, 1), "frames_per_sec": round(num_frames / seconds, 2)}
+
+
+def run_case(case):
+    """Encodes and decodes one synthetic payload and returns its result record.
+
+    Top-level so it can run in a fresh worker process, which keeps peak RSS per case.
+    """
+    encoder_core.status_callback = None
+    decoder_core.status_callback = None
+    result = dict(case, ok=False, error=None)
+    with tempfile.TemporaryDirectory(prefix='text_video_bench_') as work_dir:
+        input_path = os.path.join(work_dir, 'payload.bin')
+        write_payload(input_path, case["payload_bytes"], case["payload"])
+        try:
+            encode_timer = StageTimer()
+            payload, _ = encode_timer.run("step2", encoder_core.step2_map_input_file, input_path)
+            password = BENCHMARK_PASSWORD if case["encrypt"] else None
+            payload, header_extra = encode_timer.run("step2_stages", encoder_core.step2_apply_payload_stages,
+                                                     payload, case["profile"], case["compress"], password, case["fec"])
+            if payload is None:
+                raise RuntimeError("Compressing, encrypting or error-correcting the payload failed")
+            plan = encode_timer.run("step3", encoder_core.step3_plan_visual_representation,
+                                    payload, case["profile"], header_extra)
+            frames = encoder_core.step4_generate_frames(payload, plan, case["workers"])
+            video_path = encode_timer.run("step4_5", encoder_core.step5_compile_video, plan, frames,
+                                          os.path.join(work_dir, 'payload.mp4'), encoder_core.DEFAULT_FPS,
+                                          case["codec"])
+            if video_path is None:
+                raise RuntimeError("Video compilation failed")
+            num_frames = plan["num_header_frames"] + plan["num_frames"]
+            result["frames"] = num_frames
+            result["video_bytes"] = os.path.getsize(video_path)
+            if isinstance(payload, mmap.mmap):
+                payload.close()
+            result["encode"] = dict(stages=encode_timer.stages, seconds=round(encode_timer.total_seconds(), 4),
+                                    **rates(case["payload_bytes"], num_frames, encode_timer.total_seconds()))
+
+            decode_timer = StageTimer()
+            if case["workers"] > 1:
+                header, data = decode_timer.run("step8_9", decoder_core.step9_decode_segments_parallel,
+                                                video_path, case["workers"])
+            else:
+                def step8_9(path):
+                    _, header, frames = decoder_core.step8_extract_and_resize_frames(path)
+                    return header, decoder_core.step9_decode_frames_to_binary(frames, header)
+                header, data = decode_timer.run("step8_9", step8_9, video_path)
+            data = decode_timer.run("step10_stages", decoder_core.step10_undo_payload_stages, data, header, password)
+            result["decode"] = dict(stages=decode_timer.stages, seconds=round(decode_timer.total_seconds(), 4),
+                                    **rates(case["payload_bytes"], num_frames, decode_timer.total_seconds()))
+            with open(input_path, 'rb') as f_in:
+                result["ok"] = data == f_in.read()
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["peak_rss_mb"], result["peak_child_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_benchmark(cases, progress_callback=None):
+    """Runs each case in its own fresh process, one at a time so they don't compete
+    for cores, and returns the results document."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_case, case).result()
+        results.append(result)
+        if progress_callback:
+            progress_callback(result)
+    return {
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpu_count": os.cpu_count()},
+        "results": results,
+    }
+
+
+def format_result(result):
+    """One table row for a result."""
+    label = f"{result['profile']:>12} {result['payload_bytes']:>11}B"
+    if result["error"]:
+        return f"{label}  ERROR {result['error']}"
+    encode, decode = result["encode"], result["decode"]
+    return (f"{label}  enc {encode['seconds']:>8.2f}s {encode['bits_per_sec'] / 1e6:>8.2f} Mbit/s "
+            f"{encode['frames_per_sec']:>8.1f} fps  dec {decode['seconds']:>8.2f}s "
+            f"{decode['bits_per_sec'] / 1e6:>8.2f} Mbit/s  video {result['video_bytes'] / (1 << 20):>8.2f} MiB  "
+            f"rss {result['peak_rss_mb']:>7.1f} MiB  {'ok' if result['ok'] else 'MISMATCH'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the encode/decode pipelines on synthetic payloads.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="payload sizes (default: %(default)s)")
+    parser.add_argument('--profiles', default=DEFAULT_PROFILES, help="comma-separated frame profiles (default: %(default)s)")
+    parser.add_argument('--payload', choices=('random', 'text'), default='random',
+                        help="random bytes, or repetitive log lines that compress well")
+    parser.add_argument('-c', '--codec', default=DEFAULT_CODEC, choices=sorted(VIDEO_CODECS))
+    parser.add_argument('--compress', choices=sorted(CODECS), default=None)
+    parser.add_argument('--encrypt', action='store_true', help="encrypt the payload with a fixed password")
+    parser.add_argument('--fec', action='store_true', help="add interleaved error correction")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes for step4 and segment decoding (default: %(default)s)")
+    parser.add_argument('-o', '--output', default=DEFAULT_RESULTS, help="JSON results file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',')]
+    except ValueError:
+        parser.error(f"bad --sizes '{args.sizes}'; expected e.g. 1K,10M")
+    profiles = args.profiles.split(',')
+    unknown = [profile for profile in profiles if profile not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(unknown)}")
+
+    cases = [{"profile": profile, "payload_bytes": size, "payload": args.payload, "codec": args.codec,
+              "compress": args.compress, "encrypt": args.encrypt, "fec": args.fec, "workers": args.workers}
+             for profile in profiles for size in sizes]
+    document = run_benchmark(cases, lambda result: print(format_result(result), file=sys.stderr))
+    with open(args.output, 'w', encoding='utf-8') as f_out:
+        json.dump(document, f_out, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0 if all(result["ok"] for result in document["results"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
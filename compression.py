@@ -0,0 +1,68 @@
+"""Optional compression of the payload before it is turned into bits.
+
+Uses the streaming compressors of the standard library, fed CHUNK_BYTES at a time,
+so a memory-mapped input is never read into memory whole. The stream header's
+extra["compression"] records the codec and, unless the payload is encrypted, the
+length and CRC32 of the original data, so the decoder can undo it and check it.
+"""
+import bz2
+import lzma
+import zlib
+
+# Input bytes handed to a (de)compressor at a time
+CHUNK_BYTES = 1 << 20
+
+CODECS = {
+    # Fast, moderate ratio
+    "zlib": {"compressor": lambda: zlib.compressobj(6), "decompressor": zlib.decompressobj},
+    # Best ratio on logs and JSON, slowest to encode
+    "lzma": {"compressor": lambda: lzma.LZMACompressor(preset=6), "decompressor": lzma.LZMADecompressor},
+    "bz2": {"compressor": lambda: bz2.BZ2Compressor(9), "decompressor": bz2.BZ2Decompressor},
+}
+
+
+def _codec(codec):
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec '{codec}'. Choose from: {', '.join(CODECS)}")
+    return CODECS[codec]
+
+
+def compression_params(data, codec, record_checksum=True):
+    """Returns the extra["compression"] header entry for data compressed with codec.
+
+    record_checksum=False leaves out the length and CRC32 of data, which must not
+    reach the clear header when the payload is encrypted: they would let anyone
+    check guesses at a short plaintext without the password.
+    """
+    if not record_checksum:
+        return {"codec": codec}
+    return {"codec": codec, "data_bytes": len(data), "data_crc32": zlib.crc32(data)}
+
+
+def iter_compressed_chunks(data, codec):
+    """Yields the compressed form of data (any bytes-like object, e.g. an mmap) chunk by chunk."""
+    compressor = _codec(codec)["compressor"]()
+    data_view = memoryview(data)
+    for start in range(0, len(data_view), CHUNK_BYTES):
+        chunk = compressor.compress(data_view[start : start + CHUNK_BYTES])
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def iter_decompressed_chunks(data, codec):
+    """Yields the decompressed form of data chunk by chunk. Raises ValueError if the
+    compressed stream is corrupted."""
+    decompressor = _codec(codec)["decompressor"]()
+    data_view = memoryview(data)
+    try:
+        for start in range(0, len(data_view), CHUNK_BYTES):
+            chunk = decompressor.decompress(data_view[start : start + CHUNK_BYTES])
+            if chunk:
+                yield chunk
+            if decompressor.eof:
+                return
+    except (zlib.error, lzma.LZMAError, OSError) as e:
+        raise ValueError(f"Corrupted {codec} stream: {e}")
+    if hasattr(decompressor, 'flush'):
+        yield decompressor.flush()
@@ -0,0 +1,547 @@
+"""Headless decoder pipeline (steps 8-10): video -> stream header + frames -> payload bytes.
+
+Nothing here imports tkinter, so it can run in batch jobs and worker processes. Status
+lines go to status_callback; the decoder GUI points it at its status box and the
+command line at stderr.
+"""
+import os
+import codecs
+import math
+import multiprocessing
+import cv2
+import numpy as np
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import compression
+import encryption
+import fec
+from frame_profile import frames_covering_bits, make_plan, sample_frame_bits
+from instrumentation import add_counters, timed_iterator, timed_stage
+from stream_header import (decode_header_frame, header_frame_count,
+                           parse_header, parse_header_length)
+from video_codecs import open_capture
+
+# Worker processes for segment decoding (1 = read the video sequentially in one thread)
+DECODER_WORKERS = os.cpu_count() or 1
+# Pixels a segment must hold (~0.5 s of decoding) to pay for starting a spawned worker (~0.3 s)
+MIN_SEGMENT_PIXELS = 16 * 1920 * 1080
+
+# Text output is decoded and written this many bytes at a time
+TEXT_CHUNK_BYTES = 1 << 20
+# Characters of decoded text kept for a GUI preview
+TEXT_PREVIEW_CHARS = 20000
+
+# Called with every status line (None = silent)
+status_callback = None
+
+def update_status(message):
+    """Passes a status line to status_callback, if one is set."""
+    if status_callback:
+        status_callback(message)
+
+# Called with (message, done, total) for frame progress (None = report it as a status line)
+progress_callback = None
+
+def update_progress(message, done, total=None):
+    """Reports how far a frame loop has got. The GUIs set progress_callback and show only
+    the latest report; otherwise message becomes a status line."""
+    if progress_callback:
+        progress_callback(message, done, total)
+    else:
+        update_status(message)
+
+def read_stream_header(video_capture):
+    """Reads the header frame(s) at the start of the capture and returns the parsed
+    header, with the payload "plan" and "num_header_frames" added. The capture is
+    left on the first payload frame. Raises ValueError if the header is missing or corrupted."""
+    def next_header_frame_bytes():
+        success, frame_original = video_capture.read()
+        if not success:
+            raise ValueError("Video ended before the stream header was complete")
+        return decode_header_frame(cv2.cvtColor(frame_original, cv2.COLOR_BGR2GRAY))
+
+    header_bytes = next_header_frame_bytes()
+    num_header_frames = header_frame_count(parse_header_length(header_bytes))
+    for _ in range(num_header_frames - 1):
+        header_bytes += next_header_frame_bytes()
+
+    header = parse_header(header_bytes)
+    header["plan"] = make_plan(header["profile"], header["payload_bit_length"])
+    header["num_header_frames"] = num_header_frames
+    return header
+
+def open_video_stream(video_path):
+    """Opens the video and reads its stream header. Returns (video_capture, header)
+    with the capture positioned on the first payload frame, or (None, None) after
+    reporting the problem."""
+    video_capture = open_capture(video_path)
+    if not video_capture.isOpened():
+        update_status(f"Error: Could not open video file: {video_path}")
+        return None, None
+    try:
+        header = read_stream_header(video_capture)
+    except Exception as e:
+        video_capture.release()
+        update_status(f"Error reading stream header: {e}")
+        return None, None
+
+    plan = header["plan"]
+    update_status(f"Stream header: {plan['frame_width']}x{plan['frame_height']} frames, "
+                          f"{plan['grid_cols']}x{plan['grid_rows']} grid, {plan['channels']} channel(s), "
+                          f"{plan['bits_per_cell']} bit(s) per cell, payload {header['payload_bit_length']} bits "
+                          f"in {plan['num_frames']} frames")
+    return video_capture, header
+
+@timed_stage("step8")
+def step8_extract_and_resize_frames(video_path):
+    """Opens the video, reads its stream header and returns (success, header, frames)
+    where frames lazily yields the payload frames converted for the header's plan,
+    straight from cv2.VideoCapture (nothing touches disk). Frames keep the size the
+    video has; step9 maps the plan's grid onto them. Reading stops after the
+    frames the header says the payload needs; trailing frames are never decoded."""
+    update_status("--- Step 8: Extracting Frames ---")
+
+    video_capture, header = open_video_stream(video_path)
+    if video_capture is None:
+        return False, None, None
+
+    total_frames_hint = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    num_payload_frames = header["plan"]["num_frames"]
+    update_status(f"Video reports {total_frames_hint} frames; reading the {num_payload_frames} payload frames as they are decoded.")
+    # Timed as its own stage; step9 pulls the frames, so its time includes this one
+    frames = iter_plan_frames(video_capture, header["plan"], num_payload_frames)
+    return True, header, timed_iterator("step8_frames", frames)
+
+def convert_frame_for_plan(frame_original, plan):
+    """Converts a BGR capture frame to grayscale, or to RGB for 3-channel plans. The
+    frame is not resized: sample_frame_bits reads any size from the plan geometry."""
+    if plan["channels"] == 3:
+        return frame_original[..., ::-1]
+    return cv2.cvtColor(frame_original, cv2.COLOR_BGR2GRAY)
+
+def iter_plan_frames(video_capture, plan, max_frames=None):
+    """Yields frames of the capture converted for the frame plan (see convert_frame_for_plan),
+    stopping after max_frames frames or at the end of the video."""
+    actual_frame_count = 0
+    processed_frame_count = 0
+    try:
+        while max_frames is None or actual_frame_count < max_frames:
+            success, frame_original = video_capture.read()
+            if not success:
+                break
+            actual_frame_count += 1
+            try:
+                frame = convert_frame_for_plan(frame_original, plan)
+            except Exception as convert_err:
+                update_status(f"  ERROR converting frame {actual_frame_count}: {convert_err}")
+                add_counters(frames_failed=1)
+                continue
+            processed_frame_count += 1
+            yield frame
+
+            if processed_frame_count % 50 == 0:
+                update_progress(f"Extracted: {processed_frame_count} frames...", processed_frame_count,
+                                max_frames)
+    finally:
+        video_capture.release()
+    update_status(f"\nFrame extraction complete. Processed: {processed_frame_count} frames.")
+
+class BitPacker:
+    """Packs 0/1 bit arrays (one per frame) into a preallocated buffer of num_bytes bytes.
+
+    A frame's trailing bits that do not fill a byte are carried over to the next frame,
+    so only one frame is ever held as unpacked bits (a byte per bit). The first
+    skip_bits bits are dropped, and bits past the end of the buffer are ignored.
+    """
+
+    def __init__(self, num_bytes, skip_bits=0):
+        self.data = bytearray(num_bytes)
+        self._data_view = np.frombuffer(self.data, dtype=np.uint8)
+        self.bytes_filled = 0
+        self.bits_added = 0
+        self.skip_bits = skip_bits
+        self._carry = np.zeros(0, dtype=np.uint8)
+
+    @property
+    def full(self):
+        return self.bytes_filled == len(self.data)
+
+    def add(self, bits):
+        """Packs the next frame's bits onto the end of the buffer."""
+        self.bits_added += len(bits)
+        if self.skip_bits:
+            skipped = min(self.skip_bits, len(bits))
+            bits = bits[skipped:]
+            self.skip_bits -= skipped
+        if self.full or len(bits) == 0:
+            return
+        if len(self._carry):
+            bits = np.concatenate((self._carry, bits))
+        whole_bits = min(len(bits) // 8, len(self.data) - self.bytes_filled) * 8
+        packed = np.packbits(bits[:whole_bits])
+        self._data_view[self.bytes_filled : self.bytes_filled + len(packed)] = packed
+        self.bytes_filled += len(packed)
+        self._carry = bits[whole_bits:].copy() # Copied so the frame's bit array can be freed
+
+    def result(self):
+        """Returns the packed bytes: a bytearray, cut short if fewer bits than it holds were added."""
+        del self._data_view # The bytearray cannot be resized while NumPy views it
+        del self.data[self.bytes_filled:]
+        return self.data
+
+@timed_stage("step9")
+def step9_decode_frames_to_binary(frames, header):
+    """Samples the payload frames from step8 and returns the payload as packed bytes
+    (see BitPacker), or None if no frame could be decoded."""
+    update_status("\n--- Step 9: Decoding Frames to Binary ---")
+    if frames is None:
+        update_status("No frames were extracted, skipping binary decoding.")
+        return None
+
+    plan = header["plan"]
+
+    packer = BitPacker(header["payload_bit_length"] // 8)
+    update_status(f"Decoding frames as they are extracted. Grid: {plan['grid_cols']}x{plan['grid_rows']}, "
+                  f"{plan['channels']} channel(s), {plan['bits_per_cell']} bit(s) per cell")
+
+    num_decoded_frames = 0
+    for i, frame in enumerate(frames):
+        try:
+            # Scaled frames are fine (the grid is mapped onto them), but each cell needs a pixel
+            if frame.shape[0] < plan["grid_rows"] or frame.shape[1] < plan["grid_cols"]:
+                update_status(f"  WARNING: Frame {i} too small for the grid {frame.shape}. Skipping.")
+                add_counters(frames_skipped=1)
+                continue
+            packer.add(sample_frame_bits(frame, plan))
+            num_decoded_frames += 1
+            if num_decoded_frames % 50 == 0:
+                update_progress(f"  Decoded frame {num_decoded_frames} into binary...", num_decoded_frames,
+                                plan["num_frames"])
+        except Exception as e:
+            update_status(f"  ERROR processing frame {i}: {e}")
+            add_counters(frames_failed=1)
+
+    if num_decoded_frames == 0:
+        update_status("Error: No frames could be decoded from the video.")
+        return None
+
+    update_status(f"\nReconstructed Raw Binary Length: {packer.bits_added} bits")
+    payload_bytes = packer.result()
+    add_counters(frames=num_decoded_frames, bits=packer.bits_added, bytes=len(payload_bytes))
+    return check_payload_checksum(payload_bytes, header)
+
+def check_payload_checksum(payload_bytes, header):
+    """Checks the packed payload against the length and CRC32 in the stream header,
+    reporting any mismatch, and returns it unchanged."""
+    expected_bytes = header["payload_bit_length"] // 8
+    update_status(f"Payload length from stream header: {header['payload_bit_length']} bits")
+    if len(payload_bytes) < expected_bytes:
+        update_status(f"Warning: Reconstructed only {len(payload_bytes)} of {expected_bytes} payload bytes.")
+    else:
+        update_status(f"Packed {len(payload_bytes)} payload bytes.")
+
+    if zlib.crc32(payload_bytes) == header["payload_crc32"]:
+        update_status("Payload checksum OK.")
+    elif "fec" in header["extra"]:
+        update_status("Coded payload checksum mismatch; step10 will try to correct the errors.")
+        add_counters(checksum_mismatches=1)
+    else:
+        update_status("Warning: Payload checksum mismatch; the decoded text may contain errors.")
+        add_counters(checksum_mismatches=1)
+    return payload_bytes
+
+
+def decode_frame_range(video_path, start_frame, end_frame, plan, skip_bits=0, num_bytes=None):
+    """Decodes frames [start_frame, end_frame) of the video into packed bytes.
+
+    The first skip_bits bits of the range are dropped and at most num_bytes bytes are
+    returned (default: every whole byte in the range). Runs in a worker process with
+    its own capture, and returns the packed bytes so no unpacked bits are pickled.
+    """
+    if num_bytes is None:
+        num_bytes = ((end_frame - start_frame) * plan["bits_per_frame"] - skip_bits) // 8
+    video_capture = open_capture(video_path)
+    if not video_capture.isOpened():
+        raise IOError(f"Could not open video file: {video_path}")
+    packer = BitPacker(num_bytes, skip_bits)
+    try:
+        video_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        for _ in range(start_frame, end_frame):
+            if packer.full:
+                break
+            success, frame_original = video_capture.read()
+            if not success:
+                break
+            packer.add(sample_frame_bits(convert_frame_for_plan(frame_original, plan), plan))
+    finally:
+        video_capture.release()
+    return packer.result()
+
+def segment_boundaries(first_frame, num_frames, num_segments, bits_per_frame):
+    """Splits frames [first_frame, first_frame + num_frames) into at most num_segments
+    ranges and returns their boundaries. Every range but the last holds a whole
+    number of bytes, so the segments' packed bytes can be joined as they are."""
+    frames_per_byte = 8 // math.gcd(bits_per_frame, 8)
+    boundaries = [first_frame]
+    for k in range(1, num_segments):
+        boundary = first_frame + num_frames * k // num_segments // frames_per_byte * frames_per_byte
+        if boundary > boundaries[-1]:
+            boundaries.append(boundary)
+    boundaries.append(first_frame + num_frames)
+    return boundaries
+
+def min_segment_frames(plan):
+    """Returns the fewest frames of the plan's size worth decoding in a worker of their own."""
+    return max(1, math.ceil(MIN_SEGMENT_PIXELS / (plan["frame_width"] * plan["frame_height"])))
+
+@timed_stage("step9_segments")
+def step9_decode_segments_parallel(video_path, num_workers):
+    """Parallel step8+9: reads the stream header, splits the payload frames into ranges,
+    decodes each range in its own process (seeking with CAP_PROP_POS_FRAMES) and
+    copies each range's packed bytes into the payload in order. Returns
+    (header, payload_bytes).
+
+    Segments hold at least min_segment_frames(plan) frames; a video too short for
+    two of them is decoded sequentially (steps 8 and 9) without starting workers.
+    """
+    update_status("\n--- Steps 8-9: Decoding Video Segments in Parallel ---")
+    video_capture, header = open_video_stream(video_path)
+    if video_capture is None:
+        return None, None
+    video_capture.release()
+    first_frame = header["num_header_frames"]
+    plan = header["plan"]
+
+    # The header says exactly how many payload frames there are, so trailing frames are skipped
+    num_payload_frames = plan["num_frames"]
+    max_segments = min(num_workers, num_payload_frames // min_segment_frames(plan))
+    if max_segments <= 1:
+        update_status(f"Only {num_payload_frames} payload frames; decoding them sequentially.")
+        extraction_success, header, frames = step8_extract_and_resize_frames(video_path)
+        if not extraction_success:
+            return header, None
+        return header, step9_decode_frames_to_binary(frames, header)
+    boundaries = segment_boundaries(first_frame, num_payload_frames, max_segments, plan["bits_per_frame"])
+    num_segments = len(boundaries) - 1
+    update_status(f"Splitting {num_payload_frames} payload frames into {num_segments} segments, one worker each.")
+
+    payload_bytes = bytearray(header["payload_bit_length"] // 8)
+    bytes_filled = 0
+    # spawn: the GUI runs this on a worker thread, and forking a multithreaded process is not safe
+    with ProcessPoolExecutor(max_workers=num_segments, mp_context=multiprocessing.get_context('spawn')) as executor:
+        segment_results = executor.map(decode_frame_range, [video_path] * num_segments, boundaries[:-1],
+                                       boundaries[1:], [plan] * num_segments)
+        for segment_index, segment_bytes in enumerate(segment_results):
+            segment_bytes = segment_bytes[:len(payload_bytes) - bytes_filled]
+            payload_bytes[bytes_filled : bytes_filled + len(segment_bytes)] = segment_bytes
+            bytes_filled += len(segment_bytes)
+            update_progress(f"  Decoded segment {segment_index + 1}/{num_segments} ({len(segment_bytes)} bytes)",
+                            segment_index + 1, num_segments)
+    add_counters(segments=num_segments, frames=num_payload_frames)
+
+    del payload_bytes[bytes_filled:]
+    if len(payload_bytes) == 0:
+        update_status("Error: No frames could be decoded from the video.")
+        return header, None
+    update_status(f"\nReconstructed {len(payload_bytes)} payload bytes")
+    add_counters(bytes=len(payload_bytes))
+    return header, check_payload_checksum(payload_bytes, header)
+
+@timed_stage("step9_range")
+def step9_decode_byte_range(video_path, start_byte, end_byte, password=None):
+    """Decodes only payload bytes [start_byte, end_byte) by seeking straight to the
+    frames that carry them. Returns (header, bytes), or (header, None) on failure."""
+    update_status(f"\n--- Steps 8-9: Decoding Payload Bytes {start_byte}-{end_byte} ---")
+    video_capture, header = open_video_stream(video_path)
+    if video_capture is None:
+        return None, None
+    video_capture.release()
+
+    extra = header["extra"]
+    stored_byte_length = extra["fec"]["data_bytes"] if "fec" in extra else header["payload_bit_length"] // 8
+    plain_byte_length = extra["encryption"]["data_bytes"] if "encryption" in extra else stored_byte_length
+    try:
+        data = None
+        if "compression" in extra:
+            # A compressed stream can only be entered from the start. Its decompressed
+            # length is only known afterwards when the header leaves it out (encryption).
+            update_status("Compressed stream: decoding the payload from the start to reach the range.")
+            data = step10_decompress(read_plain_byte_range(video_path, header, 0, plain_byte_length, password), header)
+            if data is None:
+                return header, None
+        payload_byte_length = len(data) if data is not None else plain_byte_length
+        end_byte = min(end_byte, payload_byte_length)
+        if not 0 <= start_byte < end_byte:
+            update_status(f"Error: Byte range is outside the {payload_byte_length}-byte payload.")
+            return header, None
+        if data is not None:
+            return header, data[start_byte:end_byte]
+        return header, read_plain_byte_range(video_path, header, start_byte, end_byte, password)
+    except ValueError as e:
+        update_status(f"Error: {e}")
+        return header, None
+
+def read_plain_byte_range(video_path, header, start_byte, end_byte, password=None):
+    """Reads bytes [start_byte, end_byte) of the data below the encryption layer,
+    decrypting only the chunks that carry them. Raises ValueError if they fail
+    authentication."""
+    params = header["extra"].get("encryption")
+    if not params:
+        return read_stored_byte_range(video_path, header, start_byte, end_byte)
+    if not password:
+        raise ValueError("This stream is encrypted; a password is needed")
+    sealed_start, sealed_end, first_chunk, data_offset = encryption.sealed_range(params, start_byte, end_byte)
+    sealed = read_stored_byte_range(video_path, header, sealed_start, sealed_end)
+    data = encryption.decrypt(sealed, params, encryption.derive_keys(password, params), first_chunk)
+    return data[data_offset : data_offset + end_byte - start_byte]
+
+def read_stored_byte_range(video_path, header, start_byte, end_byte):
+    """Reads bytes [start_byte, end_byte) of the data below the error correction
+    layer, or of the raw payload if the stream has none."""
+    fec_header = header["extra"].get("fec")
+    if not fec_header:
+        return read_payload_byte_range(video_path, header, start_byte, end_byte)
+    # Read the whole interleaving blocks that carry the range, then correct them
+    coded_start, coded_end, data_offset = fec.coded_range(fec_header, start_byte, end_byte)
+    update_status(f"Error-corrected stream: reading coded bytes {coded_start}-{coded_end}.")
+    coded = read_payload_byte_range(video_path, header, coded_start, coded_end)
+    data, corrected_bits = fec.decode(coded, fec_header["block_codewords"])
+    update_status(f"Error correction fixed {corrected_bits} bit(s).")
+    add_counters(corrected_bits=corrected_bits)
+    return data[data_offset : data_offset + end_byte - start_byte]
+
+def read_payload_byte_range(video_path, header, start_byte, end_byte):
+    """Reads raw payload bytes [start_byte, end_byte) from the frames that carry them."""
+    plan = header["plan"]
+    start_bit, end_bit = start_byte * 8, end_byte * 8
+    first_frame, end_frame = frames_covering_bits(plan, start_bit, end_bit)
+    update_status(f"Reading payload frames {first_frame}-{end_frame - 1} of {plan['num_frames']}.")
+    add_counters(frames=end_frame - first_frame)
+    offset = header["num_header_frames"]
+    data = decode_frame_range(video_path, offset + first_frame, offset + end_frame, plan,
+                              skip_bits=start_bit - first_frame * plan["bits_per_frame"],
+                              num_bytes=end_byte - start_byte)
+    if len(data) < end_byte - start_byte:
+        update_status("Warning: Video ended before the requested range was complete.")
+    return data
+
+
+@timed_stage("step10_fec")
+def step10_correct_errors(byte_data, header):
+    """Undoes the encoder's optional error correction stage (see fec.py), fixing the
+    bit errors it can, and checks the result against the original checksum. Streams
+    without error correction are returned unchanged."""
+    fec_header = header["extra"].get("fec")
+    if byte_data is None or fec_header is None:
+        return byte_data
+    if fec_header["scheme"] != fec.SCHEME:
+        update_status(f"Error: Unsupported error correction scheme '{fec_header['scheme']}'.")
+        return None
+
+    update_status("\n--- Step 10: Correcting Errors ---")
+    data, corrected_bits = fec.decode(byte_data, fec_header["block_codewords"], fec_header["data_bytes"])
+    update_status(f"Error correction fixed {corrected_bits} bit(s); {len(data)} data bytes recovered.")
+    add_counters(corrected_bits=corrected_bits, bytes_in=len(byte_data), bytes_out=len(data))
+    if len(data) < fec_header["data_bytes"]:
+        update_status(f"Warning: Expected {fec_header['data_bytes']} data bytes; the video ended early.")
+    if zlib.crc32(data) == fec_header["data_crc32"]:
+        update_status("Corrected payload checksum OK.")
+    else:
+        update_status("Warning: Payload checksum mismatch after correction; the decoded text may contain errors.")
+    return data
+
+@timed_stage("step10_decrypt")
+def step10_decrypt(byte_data, header, password=None):
+    """Verifies and decrypts the payload if the encoder encrypted it; unencrypted
+    streams are returned unchanged. Returns None after reporting a missing or wrong
+    password or tampered data."""
+    params = header["extra"].get("encryption")
+    if byte_data is None or params is None:
+        return byte_data
+
+    update_status("\n--- Step 10: Decrypting Payload ---")
+    if not password:
+        update_status("Error: This stream is encrypted; a password is needed.")
+        return None
+    if len(byte_data) != encryption.encrypted_length(params):
+        # decrypt() accepts any run of whole chunks (for byte ranges), so a stream cut at a chunk boundary is caught here
+        update_status(f"Error: Expected {encryption.encrypted_length(params)} encrypted bytes, got {len(byte_data)}.")
+        return None
+    try:
+        data = encryption.decrypt(byte_data, params, encryption.derive_keys(password, params))
+    except ValueError as e:
+        update_status(f"Error: {e}")
+        return None
+    update_status(f"Decrypted and authenticated {len(data)} bytes.")
+    add_counters(bytes_in=len(byte_data), bytes_out=len(data))
+    return data
+
+@timed_stage("step10_decompress")
+def step10_decompress(byte_data, header):
+    """Undoes the encoder's optional compression stage and checks the result against
+    the original checksum, if the header has one (encrypted streams are authenticated
+    by decryption instead). Uncompressed streams are returned unchanged."""
+    compression_header = header["extra"].get("compression")
+    if byte_data is None or compression_header is None:
+        return byte_data
+
+    update_status(f"\n--- Step 10: Decompressing Payload ({compression_header['codec']}) ---")
+    try:
+        data = b"".join(compression.iter_decompressed_chunks(byte_data, compression_header["codec"]))
+    except ValueError as e:
+        update_status(f"Error: {e}")
+        return None
+    update_status(f"Decompressed {len(byte_data)} bytes to {len(data)} bytes.")
+    add_counters(bytes_in=len(byte_data), bytes_out=len(data))
+    if "data_crc32" in compression_header:
+        if len(data) == compression_header["data_bytes"] and zlib.crc32(data) == compression_header["data_crc32"]:
+            update_status("Decompressed payload checksum OK.")
+        else:
+            update_status("Warning: Decompressed payload does not match the original length/checksum.")
+    return data
+
+def step10_undo_payload_stages(byte_data, header, password=None):
+    """Undoes the optional payload stages recorded in the header, in the reverse of
+    encoder_core.step2_apply_payload_stages: error correction, decryption and
+    decompression. Returns the original payload bytes, or None once a stage has
+    reported its failure."""
+    byte_data = step10_correct_errors(byte_data, header)
+    byte_data = step10_decrypt(byte_data, header, password)
+    return step10_decompress(byte_data, header)
+
+def iter_decoded_text(byte_data, chunk_size=TEXT_CHUNK_BYTES):
+    """Yields the UTF-8 text in byte_data chunk by chunk.
+
+    An incremental decoder carries multi-byte characters across chunk boundaries;
+    invalid sequences become U+FFFD replacement characters.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    byte_view = memoryview(byte_data)
+    for start in range(0, len(byte_view), chunk_size):
+        text_chunk = decoder.decode(byte_view[start : start + chunk_size])
+        if text_chunk:
+            yield text_chunk
+    text_chunk = decoder.decode(b"", final=True)
+    if text_chunk:
+        yield text_chunk
+
+@timed_stage("step10_text")
+def step10_write_text(byte_data, output_path, preview_chars=TEXT_PREVIEW_CHARS):
+    """Decodes byte_data as UTF-8 and writes it to output_path in large chunks.
+
+    Returns (preview, total_chars): the first preview_chars characters, for display,
+    and the length of the whole text.
+    """
+    preview_parts = []
+    preview_length = 0
+    total_chars = 0
+    with open(output_path, 'w', encoding='utf-8', buffering=TEXT_CHUNK_BYTES) as f_out:
+        for text_chunk in iter_decoded_text(byte_data):
+            f_out.write(text_chunk)
+            total_chars += len(text_chunk)
+            if preview_length < preview_chars:
+                preview_parts.append(text_chunk[:preview_chars - preview_length])
+                preview_length += len(preview_parts[-1])
+    update_status(f"Decoded {total_chars} characters to '{output_path}'.")
+    add_counters(chars=total_chars, bytes_written=os.path.getsize(output_path))
+    return "".join(preview_parts), total_chars
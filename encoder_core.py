@@ -0,0 +1,405 @@
+"""Headless encoder pipeline (steps 2-5): text or bytes -> packed payload -> frames -> video.
+
+Nothing here imports tkinter, so it can run in batch jobs and worker processes. Status
+lines go to status_callback; the encoder GUI points it at its status box and the
+command line at stderr.
+"""
+import os
+import mmap
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import compression
+import encryption
+import fec
+from frame_profile import DEFAULT_PROFILE, make_plan, rasterize_frames
+from instrumentation import add_counters, timed_iterator, timed_stage
+from stream_header import build_header, header_frame_count, render_header_frames
+from video_codecs import DEFAULT_CODEC, open_writer, output_path_for
+
+# Pixels step4 rasterizes per NumPy batch (256 frames of the classic 100x100 profile)
+FRAME_BATCH_PIXELS = 256 * 100 * 100
+# Payload bits per batch; unpacked bits take a byte each, so this also caps the batch's temporaries
+FRAME_BATCH_BITS = 8 * 1024 * 1024
+
+# Worker processes used by step4 (1 = rasterize in this thread)
+ENCODER_WORKERS = os.cpu_count() or 1
+
+DEFAULT_OUTPUT_VIDEO = 'output_video_imageio.mp4'
+DEFAULT_FPS = 20 # FPS for encoding (e.g., for 30-sec video from 600 frames)
+
+# Called with every status line (None = silent)
+status_callback = None
+
+def update_status(message):
+    """Passes a status line to status_callback, if one is set."""
+    if status_callback:
+        status_callback(message)
+
+# Called with (message, done, total) for frame progress (None = report it as a status line)
+progress_callback = None
+
+def update_progress(message, done, total=None):
+    """Reports how far a frame loop has got. The GUIs set progress_callback and show only
+    the latest report; otherwise message becomes a status line."""
+    if progress_callback:
+        progress_callback(message, done, total)
+    else:
+        update_status(message)
+
+@timed_stage("step2")
+def step2_convert_to_binary(original_text):
+    """Converts text (or raw bytes) to a packed bit payload and returns it with its bit length.
+
+    The payload stays as packed bytes (8 bits per byte); step4 unpacks only the bits
+    of the frames it is currently rasterizing.
+    """
+    if original_text is None: return None, None
+    update_status("\n--- Step 2: Converting Text to Binary ---")
+    try:
+        if isinstance(original_text, bytes):
+            byte_data = original_text
+            update_status(f"Using {len(byte_data)} bytes of raw input.")
+        else:
+            byte_data = original_text.encode('utf-8')
+            update_status(f"Text encoded into {len(byte_data)} bytes using UTF-8.")
+    except Exception as e:
+        update_status(f"Error encoding text to bytes: {e}")
+        return None, None
+
+    preview_bits = np.unpackbits(np.frombuffer(byte_data[:7], dtype=np.uint8))
+    update_status(f"Successfully converted text to a packed binary payload.")
+    update_status(f"Binary (first 50 bits): {''.join(map(str, preview_bits[:50]))}...")
+    update_status(f"Total length of binary payload: {len(byte_data) * 8} bits")
+
+    original_binary_length = len(byte_data) * 8
+    add_counters(bytes=len(byte_data), bits=original_binary_length)
+    update_status("-----------------------------------------")
+    return byte_data, original_binary_length
+
+@timed_stage("step2")
+def step2_map_input_file(input_path):
+    """Streaming step2 for large inputs: memory-maps the file as the packed payload.
+
+    Returns (payload, bit_length) like step2_convert_to_binary, but the payload is a
+    read-only mmap, so later steps page the file in chunk by chunk (the header
+    checksum and each frame batch read only what they need) and memory stays
+    constant however large the file is. Close the mmap when encoding is done.
+    """
+    update_status("\n--- Step 2: Mapping Input File as Binary Payload ---")
+    try:
+        with open(input_path, 'rb') as f_in:
+            payload = mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        update_status(f"Error: '{input_path}' is empty; nothing to encode.")
+        return None, None
+    except OSError as e:
+        update_status(f"Error opening input file: {e}")
+        return None, None
+
+    update_status(f"Mapped {len(payload)} bytes from '{input_path}' ({len(payload) * 8} bits); "
+                  "frames will read it chunk by chunk.")
+    add_counters(bytes=len(payload), bits=len(payload) * 8)
+    update_status("-----------------------------------------")
+    return payload, len(payload) * 8
+
+def collect_payload(chunks, spool_to_file):
+    """Joins the chunks a payload stage produces into its output payload.
+
+    With spool_to_file (used when the input was memory-mapped) the chunks go to an
+    anonymous temporary file that is mapped read-only, so they never sit in memory.
+    """
+    if not spool_to_file:
+        return b"".join(chunks)
+    with tempfile.TemporaryFile(prefix='text_video_payload_') as spool:
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.flush()
+        return mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+
+@timed_stage("step2_compress")
+def step2_compress(payload, codec, record_checksum=True):
+    """Optional step after 2: compresses the payload with a streaming codec from
+    compression.CODECS, so redundant text needs fewer frames.
+
+    Returns (compressed_payload, header_extra) like step2_add_error_correction.
+    record_checksum=False keeps the original length and CRC32 out of header_extra
+    (see compression.compression_params).
+    """
+    if payload is None: return None, None
+    update_status(f"\n--- Step 2a: Compressing Payload ({codec}) ---")
+    try:
+        compressed_payload = collect_payload(compression.iter_compressed_chunks(payload, codec),
+                                             isinstance(payload, mmap.mmap))
+    except (ValueError, OSError) as e:
+        update_status(f"Error compressing payload: {e}")
+        return None, None
+
+    ratio = len(payload) / len(compressed_payload) if len(compressed_payload) else 0
+    update_status(f"Compressed {len(payload)} bytes to {len(compressed_payload)} bytes ({ratio:.1f}x smaller).")
+    add_counters(bytes_in=len(payload), bytes_out=len(compressed_payload))
+    update_status("-----------------------------------------")
+    return compressed_payload, {"compression": compression.compression_params(payload, codec, record_checksum)}
+
+@timed_stage("step2_encrypt")
+def step2_encrypt(payload, password):
+    """Optional step after compression: encrypts and authenticates the payload chunk by
+    chunk with a key stretched from password (see encryption.py).
+
+    Returns (encrypted_payload, header_extra) like step2_add_error_correction. The
+    header records the key derivation salt and parameters, never the key.
+    """
+    if payload is None: return None, None
+    update_status("\n--- Step 2a: Encrypting Payload ---")
+    if not password:
+        update_status("Error: Encryption needs a non-empty password.")
+        return None, None
+    params = encryption.new_params(len(payload))
+    keys = encryption.derive_keys(password, params)
+    encrypted_payload = collect_payload(encryption.iter_encrypted_chunks(payload, params, keys),
+                                        isinstance(payload, mmap.mmap))
+    update_status(f"Encrypted {len(payload)} bytes in {encryption.num_chunks(params)} authenticated chunk(s) "
+                  f"({encryption.CIPHER}, scrypt key derivation).")
+    add_counters(bytes_in=len(payload), bytes_out=len(encrypted_payload))
+    update_status("-----------------------------------------")
+    return encrypted_payload, {"encryption": params}
+
+@timed_stage("step2_fec")
+def step2_add_error_correction(payload, profile=DEFAULT_PROFILE, interleave_frames=fec.DEFAULT_INTERLEAVE_FRAMES):
+    """Optional step between 2 and 3: protects the payload with Hamming(7,4) codes
+    interleaved across interleave_frames frames of the profile (see fec.py).
+
+    Returns (coded_payload, header_extra), where header_extra goes to step3 so the
+    decoder can undo the coding. Memory-mapped payloads are coded into an anonymous
+    temporary file that is mapped in turn, so large inputs stay out of memory.
+    """
+    if payload is None: return None, None
+    update_status("\n--- Step 2b: Adding Forward Error Correction ---")
+    try:
+        block_codewords = fec.block_codewords_for(make_plan(profile), interleave_frames)
+    except ValueError as e:
+        update_status(f"Error: {e}. Cannot proceed.")
+        return None, None
+
+    coded_payload = collect_payload(fec.iter_encoded_chunks(payload, block_codewords), isinstance(payload, mmap.mmap))
+    update_status(f"Hamming(7,4) blocks of {block_codewords} codewords, interleaved across ~{interleave_frames} frames.")
+    update_status(f"Payload grew from {len(payload)} to {len(coded_payload)} bytes.")
+    add_counters(bytes_in=len(payload), bytes_out=len(coded_payload))
+    update_status("-----------------------------------------")
+    return coded_payload, {"fec": fec.fec_params(payload, block_codewords)}
+
+def step2_apply_payload_stages(payload, profile=DEFAULT_PROFILE, compress=None, password=None,
+                               error_correction=False, interleave_frames=fec.DEFAULT_INTERLEAVE_FRAMES):
+    """Runs the optional payload stages in their fixed order: compression (compress names
+    a compression.CODECS codec), encryption (when password is not None) and error
+    correction. decoder_core.step10_undo_payload_stages undoes them in reverse.
+
+    Returns (payload, header_extra) with every stage's header fields merged, or
+    (None, None) once a stage has reported its failure. A memory-mapped payload is
+    closed as soon as a stage has replaced it. With a password, nothing derived from
+    the plaintext goes into header_extra; the encryption tags authenticate it instead.
+    """
+    stages = []
+    if compress:
+        stages.append(lambda staged: step2_compress(staged, compress, record_checksum=password is None))
+    if password is not None:
+        stages.append(lambda staged: step2_encrypt(staged, password))
+    if error_correction:
+        stages.append(lambda staged: step2_add_error_correction(staged, profile, interleave_frames))
+
+    header_extra = {}
+    for stage in stages:
+        staged_payload, stage_extra = stage(payload)
+        if isinstance(payload, mmap.mmap):
+            payload.close()
+        if staged_payload is None:
+            return None, None
+        payload = staged_payload
+        header_extra.update(stage_extra)
+    return payload, header_extra
+
+@timed_stage("step3")
+def step3_plan_visual_representation(payload, profile=DEFAULT_PROFILE, header_extra=None):
+    """Plans visual representation from the frame profile and the payload's bit length.
+
+    The plan also carries the stream header (profile, payload length, checksum) that
+    step4 writes into the first frame(s) of the video. header_extra holds the
+    parameters of optional stages such as error correction, for the decoder.
+    """
+    if payload is None: return None
+    update_status("\n--- Step 3: Planning the Visual Representation ---")
+    
+    try:
+        plan = make_plan(profile, len(payload) * 8)
+    except ValueError as e:
+        update_status(f"Error: {e}. Cannot proceed.")
+        return None
+
+    if plan["num_frames"] == 0:
+        update_status("Warning: The binary payload is empty. No frames will be generated.")
+
+    plan["header"] = build_header(plan, payload, header_extra)
+    plan["num_header_frames"] = header_frame_count(len(plan["header"]))
+    add_counters(frames=plan["num_frames"], header_frames=plan["num_header_frames"], bits=len(payload) * 8)
+
+    update_status(f"Frame size: {plan['frame_width']}x{plan['frame_height']} pixels")
+    update_status(f"Grid: {plan['grid_cols']}x{plan['grid_rows']} cells of {plan['pixel_size']}px, {plan['channels']} channel(s), {plan['bits_per_cell']} bit(s) per cell")
+    update_status(f"Each frame will represent {plan['bits_per_frame']} bits.")
+    update_status(f"Calculated number of frames needed: {plan['num_frames']} (+{plan['num_header_frames']} header frame(s))")
+    update_status("-------------------------------------------------")
+    return plan
+
+def get_bit_chunks(payload, start_frame, end_frame, plan):
+    """Returns the bits for frames [start_frame, end_frame) as an (N, bits_per_frame) 0/1 array.
+
+    Only the bytes covering those frames are unpacked. The last chunk is zero-padded
+    to a full frame, same as the original per-frame loop.
+    """
+    bits_per_frame = plan["bits_per_frame"]
+    start_bit = start_frame * bits_per_frame
+    end_bit = end_frame * bits_per_frame
+    covering_bytes = np.frombuffer(payload, dtype=np.uint8)[start_bit // 8 : (end_bit + 7) // 8]
+    bits = np.unpackbits(covering_bytes)[start_bit % 8 : start_bit % 8 + (end_bit - start_bit)]
+    num_chunks = end_frame - start_frame
+    padded = np.zeros(num_chunks * bits_per_frame, dtype=np.uint8)
+    padded[:len(bits)] = bits
+    return padded.reshape(num_chunks, bits_per_frame)
+
+def frames_per_batch(plan):
+    """Returns how many frames step4 rasterizes at once for this plan.
+
+    FRAME_BATCH_PIXELS worth of frames (at least 8), capped by FRAME_BATCH_BITS. Every
+    batch must start on a payload byte boundary: when bits_per_frame is a multiple of 8
+    any count does (down to a single frame for hd_lossless), otherwise it is a multiple
+    of 8 frames.
+    """
+    frame_pixels = plan["frame_width"] * plan["frame_height"]
+    batch_size = min(max(8, FRAME_BATCH_PIXELS // frame_pixels), FRAME_BATCH_BITS // plan["bits_per_frame"])
+    if plan["bits_per_frame"] % 8 == 0:
+        return max(1, batch_size)
+    return max(8, batch_size // 8 * 8)
+
+def rasterize_frame_range(payload_slice, num_chunks, plan):
+    """Rasterizes num_chunks frames from a byte-aligned slice of the payload.
+
+    Top-level so it can run in a worker process; only the slice is pickled, not the
+    whole payload.
+    """
+    return rasterize_frames(get_bit_chunks(payload_slice, 0, num_chunks, plan), plan)
+
+def iter_frame_batches(payload, plan, num_workers):
+    """Yields rasterized frame batches in order, sharding them across worker processes.
+
+    At most 2 batches per worker are in flight, so memory stays bounded however long
+    the payload is.
+    """
+    num_frames = plan["num_frames"]
+    batch_size = frames_per_batch(plan)
+    bits_per_batch = batch_size * plan["bits_per_frame"]
+
+    def batch_args(batch_start):
+        batch_end = min(batch_start + batch_size, num_frames)
+        start_byte = batch_start * plan["bits_per_frame"] // 8
+        payload_slice = payload[start_byte : start_byte + (bits_per_batch + 7) // 8]
+        return payload_slice, batch_end - batch_start, plan
+
+    batch_starts = range(0, num_frames, batch_size)
+    if num_workers <= 1 or len(batch_starts) <= 1:
+        for batch_start in batch_starts:
+            yield rasterize_frame_range(*batch_args(batch_start))
+        return
+
+    # spawn: the GUI runs this on a worker thread, and forking a multithreaded process is not safe
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        pending = deque()
+        for batch_start in batch_starts:
+            if len(pending) >= 2 * num_workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(rasterize_frame_range, *batch_args(batch_start)))
+        while pending:
+            yield pending.popleft().result()
+
+def step4_generate_frames(payload, plan, num_workers=None):
+    """Returns a generator of frames for step5.
+
+    Frames are rasterized in batches of frames_per_batch(plan), spread over num_workers processes
+    (default ENCODER_WORKERS), and handed straight to the video writer in order.
+    Nothing is written to disk.
+    """
+    if payload is None or plan is None: return None
+    if plan["num_frames"] == 0: return None
+
+    update_status("\n--- Step 4: Generating Image Frames ---")
+    if num_workers is None:
+        num_workers = ENCODER_WORKERS
+    update_status(f"Frames will be streamed to the video writer in batches of {frames_per_batch(plan)} using {num_workers} worker(s).")
+    # Timed as its own stage; step5 pulls the frames, so its time includes this one
+    return timed_iterator("step4", iter_generated_frames(payload, plan, num_workers))
+
+def iter_generated_frames(payload, plan, num_workers):
+    """Yields the header frame(s) and then the payload frames in order, reporting progress."""
+    num_frames = plan["num_frames"]
+
+    total_frames_generated = 0
+    yield from render_header_frames(plan["header"], plan)
+    for frames in iter_frame_batches(payload, plan, num_workers):
+        for frame in frames:
+            yield frame
+            total_frames_generated += 1
+
+            if total_frames_generated % 20 == 0 or total_frames_generated == num_frames:
+                update_progress(f"Generated frame {total_frames_generated}/{num_frames}",
+                                total_frames_generated, num_frames)
+
+    update_status("\nFrame generation complete.")
+    update_status("-------------------------------------")
+
+@timed_stage("step5")
+def step5_compile_video(plan, frames, output_video_file=DEFAULT_OUTPUT_VIDEO, fps_cfg=DEFAULT_FPS,
+                        codec=DEFAULT_CODEC, speed=None, gop_size=None, pixel_format=None):
+    """Writes the frames from step4 into a video and returns the video filename.
+
+    codec picks a video_codecs.VIDEO_CODECS output (lossy H.264 by default, lossless
+    H.264/FFV1, or a raw .npy array); speed, gop_size and pixel_format tune the FFmpeg
+    codecs. If the output's extension does not suit the codec it is swapped for one that does.
+    """
+    if plan is None or plan["num_frames"] == 0 or frames is None: return None
+    
+    update_status(f"\n--- Step 5: Compiling Frames into Video ({codec}) ---")
+    num_frames = plan["num_header_frames"] + plan["num_frames"]
+
+    update_status(f"Streaming {num_frames} frames to the writer at {fps_cfg} FPS.")
+    
+    try:
+        actual_output_file = output_path_for(output_video_file, codec)
+        if actual_output_file != output_video_file:
+            update_status(f"Codec '{codec}' cannot be stored in '{output_video_file}'; writing '{actual_output_file}' instead.")
+        output_video_file = actual_output_file
+        update_status(f"Initializing writer for: {output_video_file}...")
+        writer = open_writer(output_video_file, plan, num_frames, fps_cfg, codec, speed, gop_size, pixel_format)
+        update_status("Writer initialized. Writing frames...")
+        frames_written_count = 0
+        write_seconds = 0.0 # Time spent inside the writer (FFmpeg), as opposed to waiting for frames
+        try:
+            for frame in frames:
+                write_started = time.perf_counter()
+                writer.append_data(frame)
+                write_seconds += time.perf_counter() - write_started
+                frames_written_count += 1
+        finally:
+            write_started = time.perf_counter()
+            writer.close()
+            write_seconds += time.perf_counter() - write_started
+        add_counters(frames_written=frames_written_count, write_seconds=round(write_seconds, 6),
+                     bytes_written=os.path.getsize(output_video_file))
+        update_status("\nVideo compilation complete.")
+        update_status(f"Total frames appended: {frames_written_count}/{num_frames}")
+        return output_video_file # Return the filename on success
+    except Exception as e:
+        update_status(f"\nAn error occurred during video compilation: {e}")
+        if "Cannot find executable" in str(e) or "No such file or directory" in str(e):
+             update_status("  -> Error suggests FFmpeg not found. Run: `pip install imageio-ffmpeg`")
+        return None
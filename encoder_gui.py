@@ -1,10 +1,15 @@
 import tkinter as tk
-from tkinter import scrolledtext, filedialog, messagebox
-import math
+from tkinter import scrolledtext, filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 import os
-import imageio
-import glob
+from frame_profile import PROFILES, DEFAULT_PROFILE
+import encoder_core
+import instrumentation
+from encoder_core import (step2_apply_payload_stages, step2_convert_to_binary, step3_plan_visual_representation,
+                          step5_compile_video)
+from compression import CODECS
+from gui_events import GuiEventQueue
+from video_player import LazyVideoPlayer, ScaledFrameCache
 import threading
 import time
 import random
@@ -18,12 +23,19 @@ stop_button = None
 
 animation_running = False
 video_playback_running = False
-video_player_frames = []
+video_player = None # video_player.LazyVideoPlayer prefetching the video being played
 current_video_frame_index = 0
 video_player_fps = 10 # Default playback FPS, will be updated from encoding FPS
 _tk_photo_image = None # Keep a reference to avoid PhotoImage garbage collection
+profile_var = None # tk.StringVar holding the selected frame_profile.PROFILES name
+fec_var = None # tk.BooleanVar: protect the payload with error correction
+compression_var = None # tk.StringVar holding a compression.CODECS name, or "none"
+password_var = None # tk.StringVar: encrypt with this password when it is not empty
+gui_events = None # gui_events.GuiEventQueue carrying status, progress and GUI calls to the main loop
+progress_label = None
+progress_bar = None
 
-# === Encoder Core Logic Functions (Steps 1-5) ===
+# === Encoder Logic (Step 1 and the GUI side of step 4; steps 2-5 live in encoder_core) ===
 
 def step1_get_text(text_widget):
     """Gets text from the Tkinter text widget."""
@@ -34,197 +46,57 @@ def step1_get_text(text_widget):
     update_status(f"Successfully got text (length: {len(original_text)}).")
     return original_text
 
-def step2_convert_to_binary(original_text):
-    """Converts text to binary and saves metadata (original binary length)."""
-    if original_text is None: return None, None
-    update_status("\n--- Step 2: Converting Text to Binary ---")
-    try:
-        byte_data = original_text.encode('utf-8')
-        update_status(f"Text encoded into {len(byte_data)} bytes using UTF-8.")
-    except Exception as e:
-        update_status(f"Error encoding text to bytes: {e}")
-        return None, None
-
-    binary_string_list = []
-    for byte in byte_data:
-        binary_representation = format(byte, '08b')
-        binary_string_list.append(binary_representation)
-    binary_string = "".join(binary_string_list)
-
-    update_status(f"Successfully converted text to a binary string.")
-    update_status(f"Binary String (first 50 chars): {binary_string[:50]}...")
-    update_status(f"Total length of binary string: {len(binary_string)} bits")
-
-    original_binary_length = len(binary_string)
-    metadata_filename = 'metadata.txt'
-    try:
-        with open(metadata_filename, 'w') as meta_file:
-            meta_file.write(str(original_binary_length))
-        update_status(f"Saved original binary length ({original_binary_length}) to {metadata_filename}")
-    except Exception as e:
-        update_status(f"Error saving metadata file: {e}")
-    update_status("-----------------------------------------")
-    return binary_string, original_binary_length
-
-def step3_plan_visual_representation(binary_string):
-    """Plans visual representation based on binary string length."""
-    if binary_string is None: return None
-    update_status("\n--- Step 3: Planning the Visual Representation ---")
-    
-    frame_width_cfg = 100
-    frame_height_cfg = 100
-    grid_size_cfg = 10
-    bits_per_frame_cfg = grid_size_cfg * grid_size_cfg
-    pixel_size_cfg = frame_width_cfg // grid_size_cfg
-
-    if bits_per_frame_cfg > 0 and len(binary_string) > 0:
-        num_frames_cfg = math.ceil(len(binary_string) / bits_per_frame_cfg)
-    elif len(binary_string) == 0:
-        num_frames_cfg = 0
-        update_status("Warning: The binary string is empty. No frames will be generated.")
-    else:
-        num_frames_cfg = 0
-        update_status("Error: bits_per_frame is zero. Cannot proceed.")
-
-    update_status(f"Frame size: {frame_width_cfg}x{frame_height_cfg} pixels")
-    update_status(f"Each frame will represent {bits_per_frame_cfg} bits.")
-    update_status(f"Calculated number of frames needed: {num_frames_cfg}")
-    update_status("-------------------------------------------------")
-    
-    plan = {
-        "frame_width": frame_width_cfg, "frame_height": frame_height_cfg,
-        "grid_size": grid_size_cfg, "bits_per_frame": bits_per_frame_cfg,
-        "pixel_size": pixel_size_cfg, "num_frames": num_frames_cfg
-    }
-    return plan
-
-def step4_generate_frames(binary_string, plan, root_window):
-    """Generates image frames with placeholder animation."""
+def step4_generate_frames(payload, plan, root_window, num_workers=None):
+    """Runs encoder_core's step4 with the placeholder animation shown until the last
+    frame has been handed to the writer."""
     global animation_running
-    if binary_string is None or plan is None: return False
-    if plan["num_frames"] == 0: return False
-
-    update_status("\n--- Step 4: Generating Image Frames ---")
-    output_frame_folder = 'output_frames'
-    os.makedirs(output_frame_folder, exist_ok=True)
-    update_status(f"Frames will be saved in folder: '{output_frame_folder}/'")
-
-    black = 0
-    white = 255
-    background_color = 128
-    
-    frame_width = plan["frame_width"]
-    frame_height = plan["frame_height"]
-    bits_per_frame = plan["bits_per_frame"]
-    grid_size = plan["grid_size"]
-    pixel_size = plan["pixel_size"]
-    num_frames = plan["num_frames"]
+    frames = encoder_core.step4_generate_frames(payload, plan, num_workers)
+    if frames is None: return None
 
     animation_running = True
-    # Ensure animate_placeholder_encoder is called in the main thread if it modifies GUI
-    root_window.after(0, lambda: animate_placeholder_encoder(root_window))
-
-
-    total_frames_generated = 0
-    for i in range(num_frames):
-        start_index = i * bits_per_frame
-        end_index = start_index + bits_per_frame
-        binary_chunk = binary_string[start_index:end_index]
-
-        if len(binary_chunk) < bits_per_frame:
-            padding_needed = bits_per_frame - len(binary_chunk)
-            binary_chunk += '0' * padding_needed
-
-        img_pil = Image.new('L', (frame_width, frame_height), color=background_color)
-        pixels = img_pil.load()
-        bit_index = 0
-        for row_idx in range(grid_size):
-            for col_idx in range(grid_size):
-                if bit_index < len(binary_chunk):
-                    bit = binary_chunk[bit_index]
-                    color = black if bit == '0' else white
-                    x_start, y_start = col_idx * pixel_size, row_idx * pixel_size
-                    for x_px in range(x_start, x_start + pixel_size):
-                        for y_px in range(y_start, y_start + pixel_size):
-                            if x_px < frame_width and y_px < frame_height:
-                                 pixels[x_px, y_px] = color
-                bit_index += 1
-        
-        frame_filename = os.path.join(output_frame_folder, f'frame_{i:04d}.png')
-        img_pil.save(frame_filename)
-        total_frames_generated += 1
-
-        if total_frames_generated % 20 == 0 or total_frames_generated == num_frames:
-            # Update status from the main thread
-            final_msg = f"Generated frame {total_frames_generated}/{num_frames}: {frame_filename}"
-            root_window.after(0, lambda msg=final_msg: update_status(msg))
-            # Giving GUI a chance to process events - use with caution for responsiveness
-            # For truly long tasks, a queue between thread and GUI is better
-            # root_window.update_idletasks() # This call from a thread can be problematic
-            time.sleep(0.01) # Small sleep to yield processing
-
-    animation_running = False 
-    root_window.after(0, lambda: update_status("\nFrame generation complete."))
-    root_window.after(0, lambda: update_status("-------------------------------------"))
-    return True
-
-def step5_compile_video(plan):
-    """Compiles frames into video using imageio and returns video filename."""
-    global video_player_fps
-    if plan is None or plan["num_frames"] == 0: return None
-    
-    update_status("\n--- Step 5: Compiling Frames into Video (Using imageio - Simplest) ---")
-    output_video_file = 'output_video_imageio.mp4'
-    fps_cfg = 20 # FPS for encoding (e.g., for 30-sec video from 600 frames)
-    video_player_fps = fps_cfg # Sync playback FPS with encoding FPS
-    output_frame_folder = 'output_frames' 
-
-    frame_pattern = os.path.join(output_frame_folder, 'frame_*.png')
-    frame_files = glob.glob(frame_pattern)
-    frame_files.sort()
-
-    if not frame_files:
-        update_status("Error: No frames found to compile video.")
-        return None
-    
-    update_status(f"Found {len(frame_files)} frames to compile using imageio at {fps_cfg} FPS.")
-    
+    # Called from the worker thread; the animation runs on the main loop
+    gui_events.call(animate_placeholder_encoder, root_window)
+    return stop_animation_when_done(frames)
+
+def stop_animation_when_done(frames):
+    """Passes the frames through and clears animation_running once they run out."""
+    global animation_running
     try:
-        update_status(f"Initializing imageio writer for: {output_video_file}...")
-        writer = imageio.get_writer(
-            output_video_file, fps=fps_cfg, format='FFMPEG', mode='I'
-        )
-        update_status("Writer initialized. Writing frames...")
-        frames_written_count = 0
-        for frame_file in frame_files:
-            try:
-                image = imageio.imread(frame_file)
-                writer.append_data(image)
-                frames_written_count += 1
-            except Exception as read_err:
-                update_status(f"    -> ERROR reading/appending frame {frame_file}: {read_err}")
-        
-        writer.close()
-        update_status("\nVideo compilation complete using imageio.")
-        update_status(f"Total frames appended: {frames_written_count}/{len(frame_files)}")
-        return output_video_file # Return the filename on success
-    except Exception as e:
-        update_status(f"\nAn error occurred during imageio video compilation: {e}")
-        if "Cannot find executable" in str(e) or "No such file or directory" in str(e):
-             update_status("  -> Error suggests FFmpeg not found. Run: `pip install imageio-ffmpeg`")
-        return None
+        yield from frames
+    finally:
+        animation_running = False
 
 # --- GUI Specific Functions ---
 
 def update_status(message):
-    """Appends a message to the status label in the GUI."""
+    """Queues a message for the status box. Safe to call from any thread."""
+    if gui_events:
+        gui_events.status(message)
+
+def show_status_lines(entries):
+    """Main loop: appends the (timestamp, message) lines of one gui_events tick in a single insert."""
     if status_label:
-        current_time = time.strftime("%H:%M:%S")
+        lines = "".join(f"[{time.strftime('%H:%M:%S', time.localtime(posted))}] {message}\n" for posted, message in entries)
         status_label.config(state=tk.NORMAL)
-        status_label.insert(tk.END, f"[{current_time}] {message}\n")
+        status_label.insert(tk.END, lines)
         status_label.see(tk.END)
         status_label.config(state=tk.DISABLED)
 
+def show_progress(message, done, total):
+    """Main loop: shows the latest frame progress from encoder_core."""
+    if progress_label: progress_label.config(text=message.strip())
+    if progress_bar and total:
+        progress_bar.config(maximum=total, value=done)
+
+def clear_status():
+    """Empties the status box and the progress display."""
+    if status_label:
+        status_label.config(state=tk.NORMAL)
+        status_label.delete('1.0', tk.END)
+        status_label.config(state=tk.DISABLED)
+    if progress_label: progress_label.config(text="")
+    if progress_bar: progress_bar.config(value=0)
+
 def animate_placeholder_encoder(root_window):
     """Simple placeholder animation for the encoder canvas."""
     global canvas, animation_running
@@ -262,16 +134,29 @@ def animate_placeholder_encoder(root_window):
 
 # --- Video Playback Functions ---
 _tk_photo_image = None # Keep a reference to avoid garbage collection
+video_image_item = None # Canvas image item that playback updates in place
+
+def render_scaled_frame(frame_rgb, size):
+    """Resizes a frame to the canvas size and converts it to a PhotoImage.
+
+    NEAREST keeps the blocky look of the cells when our small frames are upscaled;
+    BILINEAR/BICUBIC/LANCZOS would smooth them.
+    """
+    return ImageTk.PhotoImage(Image.fromarray(frame_rgb).resize(size, Image.Resampling.NEAREST))
+
+scaled_frame_cache = ScaledFrameCache(render_scaled_frame)
 
 def play_next_video_frame(root_window):
-    global video_playback_running, canvas, video_player_frames, current_video_frame_index, _tk_photo_image, video_player_fps
+    """Shows the frame that is due on the playback clock; frames that are late are dropped."""
+    global video_playback_running, canvas, video_player, current_video_frame_index, _tk_photo_image, video_image_item
 
-    if not video_playback_running or not video_player_frames or not canvas:
+    if not video_playback_running or video_player is None or not canvas:
         root_window.after(0, stop_video_playback)
         return
 
-    if current_video_frame_index < len(video_player_frames):
-        frame_pil_original = video_player_frames[current_video_frame_index]
+    next_frame = video_player.next_frame(video_player.due_sequence())
+    if next_frame is not None:
+        current_video_frame_index, frame_rgb = next_frame
         
         canvas_width = canvas.winfo_width()
         canvas_height = canvas.winfo_height()
@@ -280,37 +165,24 @@ def play_next_video_frame(root_window):
         if canvas_width <= 1: canvas_width = 300 
         if canvas_height <= 1: canvas_height = 300
 
-        # ===> RESIZE THE FRAME TO FIT THE CANVAS <===
-        # Use PIL's resize method. Image.LANCZOS is a high-quality downsampling filter,
-        # Image.NEAREST would give a pixelated look if upscaling,
-        # Image.BILINEAR or Image.BICUBIC are good general-purpose resamplers.
-        # For upscaling small images like ours, NEAREST will preserve the blocky look,
-        # while BILINEAR/BICUBIC will try to smooth it. Let's try NEAREST for the pixelated effect.
-        try:
-            frame_pil_resized = frame_pil_original.resize((canvas_width, canvas_height), Image.Resampling.NEAREST)
-        except Exception as e:
-            print(f"Error resizing frame: {e}") # Should not happen with valid images
-            frame_pil_resized = frame_pil_original # Fallback to original if resize fails
-
-        # Convert PIL Image to Tkinter PhotoImage
-        _tk_photo_image = ImageTk.PhotoImage(frame_pil_resized) 
-        
-        canvas.delete("all") 
-        # Display the resized image at canvas origin (0,0)
-        canvas.create_image(0, 0, anchor=tk.NW, image=_tk_photo_image)
-        
-        current_video_frame_index += 1
-        
-        delay_ms = int(1000 / video_player_fps) if video_player_fps > 0 else 100
-        root_window.after(delay_ms, lambda: play_next_video_frame(root_window))
-    else:
-        root_window.after(0, lambda: update_status("Video playback finished."))
+        # Scaled images are cached per (frame, canvas size); repeated frames are not redrawn
+        _tk_photo_image, changed = scaled_frame_cache.get(current_video_frame_index, frame_rgb, (canvas_width, canvas_height))
+        if video_image_item is None:
+            canvas.delete("all")
+            # Display the resized image at canvas origin (0,0)
+            video_image_item = canvas.create_image(0, 0, anchor=tk.NW, image=_tk_photo_image)
+        elif changed:
+            canvas.itemconfig(video_image_item, image=_tk_photo_image)
+    elif video_player.finished:
+        update_status(f"Video playback finished ({video_player.frames_dropped} late frame(s) dropped).")
         root_window.after(0, stop_video_playback)
+        return
 
-# Other playback functions (start_video_playback, stop_video_playback) and GUI setup remain the same
+    root_window.after(video_player.ms_until_next_frame(), lambda: play_next_video_frame(root_window))
 
 def start_video_playback(video_filename, root_window):
-    global video_playback_running, video_player_frames, current_video_frame_index, animation_running
+    """Opens the video lazily (constant time and memory) and starts the playback loop."""
+    global video_playback_running, video_player, current_video_frame_index, animation_running
     global play_button, stop_button # Ensure access to button widgets
 
     if animation_running: 
@@ -324,20 +196,16 @@ def start_video_playback(video_filename, root_window):
         return
 
     try:
-        update_status(f"Loading video for playback: {video_filename}")
-        reader = imageio.get_reader(video_filename)
-        video_player_frames.clear() # Clear previous frames
-        for frame_data in reader:
-            video_player_frames.append(Image.fromarray(frame_data))
-        reader.close()
-        
-        if not video_player_frames:
-            messagebox.showerror("Playback Error", "Video contains no frames or could not be read.")
-            return
+        update_status(f"Opening video for playback: {video_filename}")
+        if video_player is not None:
+            video_player.close()
+        video_player = LazyVideoPlayer(video_filename, fps=video_player_fps)
+        scaled_frame_cache.clear() # The cached frames belong to the previous video
 
-        update_status(f"Video loaded. Total frames: {len(video_player_frames)}. Playback FPS: {video_player_fps}")
+        update_status(f"Video opened. Total frames: {video_player.frame_count}. Playback FPS: {video_player.fps}")
         video_playback_running = True
         current_video_frame_index = 0
+        video_player.restart_clock()
         if play_button: play_button.config(state=tk.DISABLED)
         if stop_button: stop_button.config(state=tk.NORMAL)
         # Start playback loop (ensure it's called from main thread)
@@ -351,9 +219,13 @@ def start_video_playback(video_filename, root_window):
 
 def stop_video_playback():
     """Stops video playback, resets state, and updates GUI elements."""
-    global video_playback_running, canvas, play_button, stop_button
+    global video_playback_running, video_player, canvas, play_button, stop_button, video_image_item
 
     video_playback_running = False
+    if video_player is not None:
+        video_player.close()
+        video_player = None
+    video_image_item = None # The canvas is cleared below
 
     if play_button: play_button.config(state=tk.NORMAL)
     if stop_button: stop_button.config(state=tk.DISABLED)
@@ -375,73 +247,106 @@ def stop_video_playback():
     # update_status("Video playback stopped.") # Can be a bit noisy if called often
 
 def run_encoding_process_threaded(text_widget, root_window):
-    """Runs the full encoding process in a separate thread."""
-    def target():
-        global animation_running, encode_button, play_button, stop_button # Access globals
-        
-        # Ensure GUI updates happen in the main thread
-        def gui_update(task, *args):
-            root_window.after(0, lambda: task(*args))
+    """Runs the full encoding process in a separate thread.
 
-        gui_update(lambda: encode_button.config(state=tk.DISABLED) if encode_button else None)
-        gui_update(lambda: play_button.config(state=tk.DISABLED) if play_button else None)
-        gui_update(lambda: stop_button.config(state=tk.DISABLED) if stop_button else None)
-        
-        gui_update(lambda: status_label.config(state=tk.NORMAL))
-        gui_update(lambda: status_label.delete('1.0', tk.END))
-        gui_update(lambda: status_label.config(state=tk.DISABLED))
-        gui_update(stop_video_playback) # Stop any ongoing playback
+    Widgets and Tk variables are read here, on the main thread; the worker only
+    posts to gui_events."""
+    clear_status()
+    stop_video_playback() # Stop any ongoing playback
 
-        original_text = step1_get_text(text_widget) # This function already calls update_status
-        if original_text is None:
-            gui_update(lambda: encode_button.config(state=tk.NORMAL) if encode_button else None)
-            return
+    original_text = step1_get_text(text_widget) # This function already calls update_status
+    if original_text is None:
+        return
+    if encode_button: encode_button.config(state=tk.DISABLED)
+    if play_button: play_button.config(state=tk.DISABLED)
+    if stop_button: stop_button.config(state=tk.DISABLED)
+
+    profile = profile_var.get() if profile_var else DEFAULT_PROFILE
+    codec = compression_var.get() if compression_var else "none"
+    password = password_var.get() if password_var else ""
+    error_correction = fec_var.get() if fec_var else False
 
-        binary_string, _ = step2_convert_to_binary(original_text)
-        if binary_string is None:
+    # GUI updates from the worker run on the main loop at the next gui_events tick
+    gui_update = gui_events.call
+
+    def target():
+        global video_player_fps
+
+        payload, _ = step2_convert_to_binary(original_text)
+        if payload is not None:
+            payload, header_extra = step2_apply_payload_stages(payload, profile, None if codec == "none" else codec,
+                                                               password or None, error_correction)
+        if payload is None:
             gui_update(lambda: encode_button.config(state=tk.NORMAL) if encode_button else None)
             return
 
-        plan = step3_plan_visual_representation(binary_string)
+        plan = step3_plan_visual_representation(payload, profile, header_extra)
         if plan is None or plan["num_frames"] == 0:
             gui_update(lambda: encode_button.config(state=tk.NORMAL) if encode_button else None)
             return
             
-        frames_generated = step4_generate_frames(binary_string, plan, root_window)
+        frames = step4_generate_frames(payload, plan, root_window)
 
-        if not frames_generated:
-            gui_update(lambda: update_status("Frame generation failed or was skipped."))
+        if frames is None:
+            update_status("Frame generation failed or was skipped.")
             gui_update(lambda: encode_button.config(state=tk.NORMAL) if encode_button else None)
             return
 
-        video_filename = step5_compile_video(plan) 
+        video_filename = step5_compile_video(plan, frames, encoder_core.DEFAULT_OUTPUT_VIDEO, encoder_core.DEFAULT_FPS)
+        video_player_fps = encoder_core.DEFAULT_FPS # Sync playback FPS with encoding FPS
         if video_filename:
-            success_msg = f"\nSUCCESS! Video '{video_filename}' and 'metadata.txt' created."
-            gui_update(lambda: update_status(success_msg))
+            update_status(f"\nSUCCESS! Video '{video_filename}' created.")
             gui_update(lambda: messagebox.showinfo("Success", f"Video encoding process complete!\nVideo saved as: {video_filename}"))
             gui_update(lambda: play_button.config(state=tk.NORMAL) if play_button else None)
         else:
-            gui_update(lambda: update_status("\nVideo compilation failed."))
+            update_status("\nVideo compilation failed.")
             gui_update(lambda: messagebox.showerror("Error", "Video compilation failed."))
 
         gui_update(lambda: encode_button.config(state=tk.NORMAL) if encode_button else None)
 
-    thread = threading.Thread(target=target)
+    def instrumented_target():
+        # Brackets the run's stage events when $TEXT_VIDEO_METRICS is set
+        with instrumentation.capture("encode_gui"):
+            target()
+
+    thread = threading.Thread(target=instrumented_target)
     thread.daemon = True 
     thread.start()
 
 # --- Main GUI Setup ---
 def main_encoder_gui():
-    global status_label, canvas, encode_button, play_button, stop_button
+    global status_label, canvas, encode_button, play_button, stop_button, profile_var, fec_var, compression_var
+    global password_var, gui_events, progress_label, progress_bar
     
     root = tk.Tk()
     root.title("Text-to-Video Encoder")
+    # Core status lines and progress come from the worker thread; the main loop drains them in batches
+    gui_events = GuiEventQueue(root, show_status_lines, show_progress)
+    encoder_core.status_callback = update_status
+    encoder_core.progress_callback = gui_events.progress
+    instrumentation.configure_from_environment() # Stage timings as JSON lines, if $TEXT_VIDEO_METRICS is set
     root.geometry("700x800") 
 
     input_frame = tk.Frame(root, pady=10)
     input_frame.pack(fill=tk.X)
     tk.Label(input_frame, text="Enter Text to Encode:").pack(side=tk.LEFT, padx=5)
+    profile_var = tk.StringVar(root, value=DEFAULT_PROFILE)
+    # The GUI writes with the default (lossy) codec, which lossless_only profiles cannot survive
+    gui_profiles = [name for name, profile in PROFILES.items() if not profile.get("lossless_only")]
+    tk.OptionMenu(input_frame, profile_var, *gui_profiles).pack(side=tk.RIGHT, padx=10)
+    tk.Label(input_frame, text="Frame Profile:").pack(side=tk.RIGHT)
+    fec_var = tk.BooleanVar(root, value=False)
+    tk.Checkbutton(input_frame, text="Error Correction", variable=fec_var).pack(side=tk.RIGHT, padx=10)
+    compression_var = tk.StringVar(root, value="none")
+    tk.OptionMenu(input_frame, compression_var, "none", *CODECS).pack(side=tk.RIGHT, padx=10)
+    tk.Label(input_frame, text="Compression:").pack(side=tk.RIGHT)
     
+    password_frame = tk.Frame(root)
+    password_frame.pack(fill=tk.X)
+    tk.Label(password_frame, text="Password (optional, encrypts the text):").pack(side=tk.LEFT, padx=5)
+    password_var = tk.StringVar(root, value="")
+    tk.Entry(password_frame, textvariable=password_var, show="*", width=30).pack(side=tk.LEFT, padx=5)
+
     text_entry = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=80, height=10, font=("Arial", 10))
     text_entry.pack(pady=5, padx=10, fill=tk.X)
     text_entry.insert(tk.INSERT, "Hello world! This is a test of the text to video system with GUI playback.") 
@@ -471,7 +376,7 @@ def main_encoder_gui():
     tk.Label(playback_controls_subframe, text="Playback:").pack(anchor='w')
 
     play_button = tk.Button(playback_controls_subframe, text="Play Video",
-                            command=lambda: start_video_playback('output_video_imageio.mp4', root),
+                            command=lambda: start_video_playback(encoder_core.DEFAULT_OUTPUT_VIDEO, root),
                             font=("Arial", 10), state=tk.DISABLED) 
     play_button.pack(side=tk.LEFT, padx=5, pady=5)
 
@@ -484,8 +389,16 @@ def main_encoder_gui():
     status_label = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=80, height=15, font=("Arial", 9), state=tk.DISABLED, relief=tk.SUNKEN, borderwidth=2)
     status_label.pack(pady=5, padx=10, fill=tk.BOTH, expand=True)
 
+    progress_frame = tk.Frame(root)
+    progress_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+    progress_bar = ttk.Progressbar(progress_frame, orient=tk.HORIZONTAL, length=200, mode='determinate')
+    progress_bar.pack(side=tk.LEFT)
+    progress_label = tk.Label(progress_frame, text="", font=("Arial", 9), anchor='w')
+    progress_label.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
+
     root.update_idletasks()
     stop_video_playback() # Initialize canvas text and button states
+    gui_events.start()
 
     root.mainloop()
 
@@ -0,0 +1,133 @@
+"""Optional authenticated encryption of the payload, chunk by chunk.
+
+Built from the standard library only: the password is stretched with scrypt into
+an encryption key and a MAC key, each CHUNK_BYTES chunk is XORed with a SHAKE-256
+keystream derived from the key and the chunk index, and a keyed BLAKE2b tag over
+(index, last-chunk flag, ciphertext) is appended to it (encrypt-then-MAC). Chunks
+are independent, so they are processed on a thread pool (hashlib and NumPy release
+the GIL on large buffers) and a byte range can be decrypted without the rest.
+
+The stream header's extra["encryption"] records the cipher, the scrypt salt and
+cost parameters, the chunk size and the plaintext length; never the key.
+"""
+import hashlib
+import hmac
+import math
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+CIPHER = "shake256-blake2b"
+CHUNK_BYTES = 1 << 18
+TAG_BYTES = 16
+SCRYPT_COST = {"n": 1 << 14, "r": 8, "p": 1}
+PASSWORD_ENV = 'TEXT_VIDEO_PASSWORD' # Where the command line and batch runner look for the password
+
+# Threads that encrypt/decrypt chunks (1 = in the calling thread)
+ENCRYPTION_THREADS = os.cpu_count() or 1
+
+
+def new_params(data_length):
+    """Returns fresh extra["encryption"] header parameters (with a random salt) for
+    data_length bytes of plaintext."""
+    return {"cipher": CIPHER, "kdf": "scrypt", "salt": os.urandom(16).hex(), **SCRYPT_COST,
+            "chunk_bytes": CHUNK_BYTES, "data_bytes": data_length}
+
+
+def derive_keys(password, params):
+    """Stretches the password with the header's scrypt parameters into
+    (encryption_key, mac_key)."""
+    if params["cipher"] != CIPHER or params["kdf"] != "scrypt":
+        raise ValueError(f"Unsupported cipher '{params['cipher']}' / key derivation '{params['kdf']}'")
+    key_material = hashlib.scrypt(password.encode('utf-8'), salt=bytes.fromhex(params["salt"]),
+                                  n=params["n"], r=params["r"], p=params["p"],
+                                  maxmem=256 * params["n"] * params["r"] * params["p"], dklen=64)
+    return key_material[:32], key_material[32:]
+
+
+def num_chunks(params):
+    return max(1, math.ceil(params["data_bytes"] / params["chunk_bytes"]))
+
+
+def encrypted_length(params):
+    """Returns the length of the encrypted stream: the plaintext plus one tag per chunk."""
+    return params["data_bytes"] + num_chunks(params) * TAG_BYTES
+
+
+def _tag(mac_key, index, is_last, ciphertext):
+    tag = hashlib.blake2b(index.to_bytes(8, 'big') + bytes([is_last]), key=mac_key, digest_size=TAG_BYTES)
+    tag.update(ciphertext)
+    return tag.digest()
+
+
+def _xor_keystream(encryption_key, index, chunk):
+    keystream = hashlib.shake_256(encryption_key + index.to_bytes(8, 'big')).digest(len(chunk))
+    return np.bitwise_xor(np.frombuffer(chunk, dtype=np.uint8), np.frombuffer(keystream, dtype=np.uint8)).tobytes()
+
+
+def _encrypt_chunk(keys, index, is_last, chunk):
+    ciphertext = _xor_keystream(keys[0], index, chunk)
+    return ciphertext + _tag(keys[1], index, is_last, ciphertext)
+
+
+def _decrypt_chunk(keys, index, is_last, sealed_chunk):
+    ciphertext, tag = sealed_chunk[:-TAG_BYTES], sealed_chunk[-TAG_BYTES:]
+    if not hmac.compare_digest(tag, _tag(keys[1], index, is_last, ciphertext)):
+        raise ValueError(f"Authentication failed for chunk {index}: wrong password or corrupted data")
+    return _xor_keystream(keys[0], index, ciphertext)
+
+
+def _run_ordered(function, argument_tuples, num_threads):
+    """Yields function(*args) for each args in order, keeping at most 2 chunks per
+    thread in flight."""
+    if num_threads <= 1:
+        for args in argument_tuples:
+            yield function(*args)
+        return
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        pending = deque()
+        for args in argument_tuples:
+            if len(pending) >= 2 * num_threads:
+                yield pending.popleft().result()
+            pending.append(executor.submit(function, *args))
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_encrypted_chunks(data, params, keys, num_threads=None):
+    """Yields the sealed (ciphertext + tag) chunks of data (any bytes-like object, e.g. an mmap) in order."""
+    chunk_bytes = params["chunk_bytes"]
+    data_view = memoryview(data)
+    last_index = num_chunks(params) - 1
+    arguments = ((keys, index, index == last_index, data_view[index * chunk_bytes : (index + 1) * chunk_bytes])
+                 for index in range(last_index + 1))
+    yield from _run_ordered(_encrypt_chunk, arguments, num_threads or ENCRYPTION_THREADS)
+
+
+def decrypt(sealed, params, keys, first_chunk=0, num_threads=None):
+    """Verifies and decrypts sealed chunks that start with chunk first_chunk.
+
+    Raises ValueError if any chunk fails authentication (wrong password, corruption,
+    or chunks reordered or cut off).
+    """
+    sealed_chunk_bytes = params["chunk_bytes"] + TAG_BYTES
+    sealed_view = memoryview(sealed)
+    last_index = num_chunks(params) - 1
+    arguments = ((keys, first_chunk + position, first_chunk + position == last_index,
+                  sealed_view[start : start + sealed_chunk_bytes])
+                 for position, start in enumerate(range(0, len(sealed_view), sealed_chunk_bytes)))
+    return b"".join(_run_ordered(_decrypt_chunk, arguments, num_threads or ENCRYPTION_THREADS))
+
+
+def sealed_range(params, start_byte, end_byte):
+    """Maps plaintext bytes [start_byte, end_byte) to the sealed chunks that carry them.
+
+    Returns (sealed_start, sealed_end, first_chunk, data_offset): decrypt sealed bytes
+    [sealed_start, sealed_end) starting at chunk first_chunk, then skip data_offset bytes.
+    """
+    chunk_bytes = params["chunk_bytes"]
+    first_chunk = start_byte // chunk_bytes
+    end_chunk = math.ceil(end_byte / chunk_bytes)
+    sealed_end = min(end_chunk * (chunk_bytes + TAG_BYTES), encrypted_length(params))
+    return first_chunk * (chunk_bytes + TAG_BYTES), sealed_end, first_chunk, start_byte - first_chunk * chunk_bytes
@@ -0,0 +1,142 @@
+"""Forward error correction for the payload: Hamming(7,4) codes interleaved across frames.
+
+Every 4 payload bits become a 7-bit Hamming codeword that survives any one flipped
+bit. Codewords are grouped into blocks spanning about interleave_frames frames and each
+block is sent bit plane by bit plane (bit 0 of every codeword, then bit 1, ...), so
+the 7 bits of a codeword are a seventh of a block apart. With interleave_frames >= 7
+they land in different frames, and a smeared or badly compressed frame costs each
+codeword at most one bit. Encoding and decoding are vectorized over whole blocks.
+
+The stream header's extra["fec"] records the scheme, the block size in codewords and
+the length and CRC32 of the uncorrected data.
+"""
+import math
+import zlib
+import numpy as np
+
+SCHEME = "hamming74"
+DEFAULT_INTERLEAVE_FRAMES = 8
+# Data bytes encoded/decoded per NumPy batch of blocks
+BATCH_DATA_BYTES = 1 << 20
+
+# Codeword bit order p1 p2 d1 p3 d2 d3 d4, so a nonzero syndrome is the 1-based error position
+_GENERATOR = np.array([[1, 1, 1, 0, 0, 0, 0],
+                       [1, 0, 0, 1, 1, 0, 0],
+                       [0, 1, 0, 1, 0, 1, 0],
+                       [1, 1, 0, 1, 0, 0, 1]], dtype=np.uint8)
+_PARITY_CHECK = np.array([[1, 0, 1, 0, 1, 0, 1],
+                          [0, 1, 1, 0, 0, 1, 1],
+                          [0, 0, 0, 1, 1, 1, 1]], dtype=np.uint8)
+_SYNDROME_WEIGHTS = np.array([1, 2, 4], dtype=np.uint8)
+_DATA_POSITIONS = [2, 4, 5, 6]
+
+
+def block_codewords_for(plan, interleave_frames=DEFAULT_INTERLEAVE_FRAMES):
+    """Returns the codewords per interleaving block for a frame plan: as many as fill
+    interleave_frames frames, rounded down to a multiple of 8 so blocks stay byte-aligned."""
+    return max(8, interleave_frames * plan["bits_per_frame"] // 56 * 8)
+
+
+def block_sizes(block_codewords):
+    """Returns (data_bytes, coded_bytes) of one full block."""
+    return block_codewords // 2, block_codewords * 7 // 8
+
+
+def coded_length(data_length, block_codewords):
+    """Returns the coded length in bytes of data_length data bytes. A short last block
+    is padded only up to a multiple of 8 codewords."""
+    data_block_bytes, coded_block_bytes = block_sizes(block_codewords)
+    full_blocks, remainder = divmod(data_length, data_block_bytes)
+    last_codewords = math.ceil(remainder * 2 / 8) * 8
+    return full_blocks * coded_block_bytes + last_codewords * 7 // 8
+
+
+def fec_params(data, block_codewords):
+    """Returns the extra["fec"] header entry for data."""
+    return {"scheme": SCHEME, "block_codewords": block_codewords,
+            "data_bytes": len(data), "data_crc32": zlib.crc32(data)}
+
+
+def _encode_blocks(data_bits, block_codewords):
+    """Encodes (num_blocks, block_codewords * 4) data bits into interleaved coded bits."""
+    num_blocks = data_bits.shape[0]
+    codewords = data_bits.reshape(num_blocks, block_codewords, 4) @ _GENERATOR & 1
+    return codewords.transpose(0, 2, 1).reshape(num_blocks, -1).astype(np.uint8)
+
+
+def iter_encoded_chunks(data, block_codewords):
+    """Yields the coded bytes of data (any bytes-like object, e.g. an mmap) in order,
+    a batch of whole blocks at a time, so memory stays bounded for large inputs."""
+    data_block_bytes, _ = block_sizes(block_codewords)
+    blocks_per_batch = max(1, BATCH_DATA_BYTES // data_block_bytes)
+    data_view = np.frombuffer(data, dtype=np.uint8)
+    full_blocks = len(data_view) // data_block_bytes
+
+    for first_block in range(0, full_blocks, blocks_per_batch):
+        end_block = min(first_block + blocks_per_batch, full_blocks)
+        batch = data_view[first_block * data_block_bytes : end_block * data_block_bytes]
+        data_bits = np.unpackbits(batch).reshape(end_block - first_block, -1)
+        yield np.packbits(_encode_blocks(data_bits, block_codewords)).tobytes()
+
+    remainder = data_view[full_blocks * data_block_bytes:]
+    if len(remainder):
+        last_codewords = math.ceil(len(remainder) * 2 / 8) * 8
+        data_bits = np.zeros(last_codewords * 4, dtype=np.uint8)
+        data_bits[:len(remainder) * 8] = np.unpackbits(remainder)
+        yield np.packbits(_encode_blocks(data_bits[None, :], last_codewords)).tobytes()
+
+
+def _decode_blocks(coded_bits, block_codewords):
+    """Corrects (num_blocks, block_codewords * 7) interleaved coded bits. Returns the
+    data bits as (num_blocks, block_codewords * 4) and the number of corrected bits."""
+    num_blocks = coded_bits.shape[0]
+    codewords = coded_bits.reshape(num_blocks, 7, block_codewords).transpose(0, 2, 1).copy()
+    syndromes = (codewords @ _PARITY_CHECK.T & 1) @ _SYNDROME_WEIGHTS
+    block_index, codeword_index = np.nonzero(syndromes)
+    codewords[block_index, codeword_index, syndromes[block_index, codeword_index] - 1] ^= 1
+    return codewords[:, :, _DATA_POSITIONS].reshape(num_blocks, -1), len(block_index)
+
+
+def decode(coded, block_codewords, data_length=None):
+    """Corrects and decodes coded bytes that start on a block boundary.
+
+    Returns (data, corrected_bits). data is cut to data_length bytes when given;
+    otherwise it includes the zero padding of a short last block.
+    """
+    data_block_bytes, coded_block_bytes = block_sizes(block_codewords)
+    blocks_per_batch = max(1, BATCH_DATA_BYTES // data_block_bytes)
+    coded_view = np.frombuffer(coded, dtype=np.uint8)
+    full_blocks = len(coded_view) // coded_block_bytes
+
+    data_parts = []
+    corrected_bits = 0
+    for first_block in range(0, full_blocks, blocks_per_batch):
+        end_block = min(first_block + blocks_per_batch, full_blocks)
+        batch = coded_view[first_block * coded_block_bytes : end_block * coded_block_bytes]
+        data_bits, corrected = _decode_blocks(np.unpackbits(batch).reshape(end_block - first_block, -1), block_codewords)
+        data_parts.append(np.packbits(data_bits).tobytes())
+        corrected_bits += corrected
+
+    remainder = coded_view[full_blocks * coded_block_bytes:]
+    last_codewords = len(remainder) * 8 // 7 // 8 * 8
+    if last_codewords:
+        coded_bits = np.unpackbits(remainder)[:last_codewords * 7]
+        data_bits, corrected = _decode_blocks(coded_bits[None, :], last_codewords)
+        data_parts.append(np.packbits(data_bits).tobytes())
+        corrected_bits += corrected
+
+    data = b"".join(data_parts)
+    return (data[:data_length] if data_length is not None else data), corrected_bits
+
+
+def coded_range(fec, start_byte, end_byte):
+    """Maps data bytes [start_byte, end_byte) to the whole blocks that carry them.
+
+    Returns (coded_start, coded_end, data_offset): decode coded bytes
+    [coded_start, coded_end) and skip data_offset bytes to reach start_byte.
+    """
+    data_block_bytes, coded_block_bytes = block_sizes(fec["block_codewords"])
+    first_block = start_byte // data_block_bytes
+    end_block = math.ceil(end_byte / data_block_bytes)
+    coded_end = min(end_block * coded_block_bytes, coded_length(fec["data_bytes"], fec["block_codewords"]))
+    return first_block * coded_block_bytes, coded_end, start_byte - first_block * data_block_bytes
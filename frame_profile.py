@@ -0,0 +1,245 @@
+"""Frame geometry profiles shared by the encoder and the decoder.
+
+A profile fixes the frame size, the cell size (pixel_size) and how many bits each
+cell carries. With bits_per_cell > 1 a cell holds one of 2**bits_per_cell gray levels;
+the levels are Gray-coded so misreading a cell as a neighbouring level flips one bit.
+With channels = 3 the R, G and B values of a cell carry independent bits, so frames
+are (H, W, 3) RGB instead of (H, W) grayscale.
+"""
+import functools
+import math
+import numpy as np
+
+BACKGROUND_COLOR = 128 # Anything outside the grid
+SAMPLE_FRACTION = 0.5 # Central part of a cell (per axis) the decoder averages; codec ringing is worst at the edges
+LEVEL_PERCENTILE = 1 # Percentiles of the cell means taken as a frame's darkest and brightest level
+CALIBRATION_ROUNDS = 3 # Least-squares refinements of each per-frame level fit
+CALIBRATION_CELLS = 16384 # At most about this many cells (per channel) are used to fit the levels
+MIN_CALIBRATION_GAIN = 0.25 # Below this contrast the fit is not trusted and the nominal levels are used
+GOOD_FIT_RESIDUAL = 0.125 # A nominal fit with an RMS residual below this fraction of the level step is kept
+
+PROFILES = {
+    # The original layout: 100x100 frames, 10x10 grid, black/white cells (100 bits/frame)
+    "classic": {"frame_width": 100, "frame_height": 100, "pixel_size": 10, "bits_per_cell": 1},
+    # 4 gray levels on a 40x30 grid (2400 bits/frame)
+    "dense_gray": {"frame_width": 320, "frame_height": 240, "pixel_size": 8, "bits_per_cell": 2},
+    # Full HD with 4px black/white cells (129,600 bits/frame)
+    "hd": {"frame_width": 1920, "frame_height": 1080, "pixel_size": 4, "bits_per_cell": 1},
+    # Full HD with 4px cells and 4 gray levels (259,200 bits/frame)
+    "hd_gray": {"frame_width": 1920, "frame_height": 1080, "pixel_size": 4, "bits_per_cell": 2},
+    # The classic grid with a bit in each of R, G and B (300 bits/frame)
+    "classic_rgb": {"frame_width": 100, "frame_height": 100, "pixel_size": 10, "bits_per_cell": 1, "channels": 3},
+    # Full HD, 8px cells, one bit per color channel (97,200 bits/frame)
+    "hd_rgb": {"frame_width": 1920, "frame_height": 1080, "pixel_size": 8, "bits_per_cell": 1, "channels": 3},
+    # Every pixel carries a full byte per channel (49,766,400 bits/frame); lossless codecs only
+    "hd_lossless": {"frame_width": 1920, "frame_height": 1080, "pixel_size": 1, "bits_per_cell": 8, "channels": 3,
+                    "lossless_only": True},
+}
+DEFAULT_PROFILE = "classic"
+
+
+def make_plan(profile, payload_bit_length=0):
+    """Returns the frame plan dict for a profile (a PROFILES name or a profile dict).
+
+    The plan holds the profile's fields (channels defaults to 1, lossless_only to
+    False; a lossless_only profile cannot survive a lossy codec) plus the derived
+    grid_cols, grid_rows, bits_per_frame and the num_frames needed for
+    payload_bit_length bits.
+    """
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile '{profile}'. Choose from: {', '.join(PROFILES)}")
+        profile = PROFILES[profile]
+
+    frame_width = profile["frame_width"]
+    frame_height = profile["frame_height"]
+    pixel_size = profile["pixel_size"]
+    bits_per_cell = profile["bits_per_cell"]
+    channels = profile.get("channels", 1)
+    if not 1 <= bits_per_cell <= 8:
+        raise ValueError(f"bits_per_cell must be between 1 and 8, got {bits_per_cell}")
+    if channels not in (1, 3):
+        raise ValueError(f"channels must be 1 (grayscale) or 3 (RGB), got {channels}")
+
+    grid_cols = frame_width // pixel_size
+    grid_rows = frame_height // pixel_size
+    bits_per_frame = grid_cols * grid_rows * channels * bits_per_cell
+    if bits_per_frame == 0:
+        raise ValueError(f"pixel_size {pixel_size} leaves no cells in a {frame_width}x{frame_height} frame")
+
+    num_frames = math.ceil(payload_bit_length / bits_per_frame) if payload_bit_length > 0 else 0
+    return {
+        "frame_width": frame_width, "frame_height": frame_height,
+        "pixel_size": pixel_size, "bits_per_cell": bits_per_cell, "channels": channels,
+        "grid_cols": grid_cols, "grid_rows": grid_rows,
+        "bits_per_frame": bits_per_frame, "num_frames": num_frames,
+        "lossless_only": profile.get("lossless_only", False),
+    }
+
+
+def frames_covering_bits(plan, start_bit, end_bit):
+    """Returns the [first_frame, end_frame) range of payload frames that carries
+    payload bits [start_bit, end_bit)."""
+    bits_per_frame = plan["bits_per_frame"]
+    return start_bit // bits_per_frame, math.ceil(end_bit / bits_per_frame)
+
+
+def level_colors(plan):
+    """Returns the uint8 gray value of every cell level, evenly spread from 0 to 255."""
+    num_levels = 1 << plan["bits_per_cell"]
+    return np.round(np.arange(num_levels) * 255 / (num_levels - 1)).astype(np.uint8)
+
+
+def rasterize_frames(bit_chunks, plan):
+    """Rasterizes a batch of bit chunks into an (N, H, W) uint8 array of grayscale frames,
+    or (N, H, W, 3) RGB frames for 3-channel plans.
+
+    bit_chunks is an (N, bits_per_frame) 0/1 array. Each group of bits_per_cell bits
+    sets one channel of one pixel_size x pixel_size cell; cells are laid out row by row
+    on the grid, with a cell's channels in R, G, B order.
+    """
+    bits_per_cell = plan["bits_per_cell"]
+    channels = plan["channels"]
+    grid_rows = plan["grid_rows"]
+    grid_cols = plan["grid_cols"]
+    pixel_size = plan["pixel_size"]
+    num_chunks = bit_chunks.shape[0]
+
+    # uint8 throughout: a cell holds at most 8 bits, and int64 temporaries would be 8x a frame
+    weights = (1 << np.arange(bits_per_cell - 1, -1, -1)).astype(np.uint8)
+    levels = bit_chunks.reshape(num_chunks, grid_rows, grid_cols, channels, bits_per_cell).astype(np.uint8, copy=False) @ weights
+    # Gray code -> level (in place), so neighbouring levels differ in exactly one bit
+    shift = 1
+    while shift < bits_per_cell:
+        levels ^= levels >> shift
+        shift <<= 1
+    grid_pixels = level_colors(plan)[levels]
+    # Blow each cell up to pixel_size x pixel_size pixels
+    if pixel_size > 1:
+        grid_pixels = grid_pixels.repeat(pixel_size, axis=1).repeat(pixel_size, axis=2)
+
+    frames = np.full((num_chunks, plan["frame_height"], plan["frame_width"], channels), BACKGROUND_COLOR, dtype=np.uint8)
+    frames[:, :grid_pixels.shape[1], :grid_pixels.shape[2]] = grid_pixels
+    if channels == 1:
+        return frames[..., 0]
+    return frames
+
+
+@functools.lru_cache(maxsize=64)
+def cell_sample_indices(length, cells, pixel_size, plan_length):
+    """Returns (index, samples) for one axis of a frame that is length pixels long where
+    the plan expects plan_length: index picks samples pixels from the central
+    SAMPLE_FRACTION of each of the first cells cells, as an index array, or as a slice
+    when that is every pixel in order (1-pixel cells at the plan size).
+
+    The positions are computed from the plan geometry, so frames scaled by the codec
+    or a re-encode are read without resizing them first.
+    """
+    scale = length / plan_length
+    inner = pixel_size * SAMPLE_FRACTION
+    samples = max(1, round(inner * scale))
+    offsets = (pixel_size - inner) / 2 + (np.arange(samples) + 0.5) * inner / samples
+    positions = (np.arange(cells)[:, None] * pixel_size + offsets) * scale
+    indices = np.minimum(positions.astype(np.intp), length - 1).ravel()
+    if np.array_equal(indices, np.arange(len(indices))):
+        return slice(0, len(indices)), samples
+    indices.flags.writeable = False
+    return indices, samples
+
+
+def fit_levels(cell_means, colors, gain, offset):
+    """Refines a (gain, offset) level fit by assigning every cell its nearest level and
+    refitting by least squares. Returns (gain, offset, mean squared residual), or None
+    if the cells stop spanning enough contrast to fit."""
+    # The levels are evenly spaced, so rounding finds the nearest one
+    level_step = (colors[-1] - colors[0]) / (len(colors) - 1)
+    means_mean = cell_means.mean(axis=0)
+    for _ in range(CALIBRATION_ROUNDS):
+        levels = np.rint((cell_means - offset) / (gain * level_step))
+        assigned = colors[np.clip(levels, 0, len(colors) - 1).astype(np.intp)]
+        assigned_mean = assigned.mean(axis=0)
+        assigned_centered = assigned - assigned_mean
+        variance = (assigned_centered ** 2).mean(axis=0)
+        if np.any(variance == 0):
+            return None
+        gain = (assigned_centered * (cell_means - means_mean)).mean(axis=0) / variance
+        if np.any(gain < MIN_CALIBRATION_GAIN):
+            return None
+        offset = means_mean - gain * assigned_mean
+    return gain, offset, float(((cell_means - (gain * assigned + offset)) ** 2).mean())
+
+
+def calibrate_levels(cell_means, colors):
+    """Returns (gain, offset) per channel so that cell_means ~ gain * level color + offset.
+
+    Compression, limited-range YUV and re-encodes shift and squeeze the levels, so fixed
+    thresholds misread them. Two starting points are refined (see fit_levels): the
+    nominal levels and, unless the nominal fit is already tight, one mapping the frame's
+    darkest and brightest cells onto the outer levels. The stretched fit must clearly
+    beat the nominal one; a frame with too little contrast to fit (e.g. one holding a
+    single level) keeps the nominal levels.
+    """
+    channels = cell_means.shape[1]
+    nominal = np.ones(channels), np.zeros(channels)
+    # The levels are the same all over the frame, so a spread-out subset of cells fits them
+    cell_means = cell_means[::-(-len(cell_means) // CALIBRATION_CELLS)].astype(np.float64)
+
+    best = fit_levels(cell_means, colors, *nominal)
+    level_step = (colors[-1] - colors[0]) / (len(colors) - 1)
+    if best is not None and best[2] < (GOOD_FIT_RESIDUAL * level_step) ** 2:
+        return best[:2]
+    low, high = np.percentile(cell_means, [LEVEL_PERCENTILE, 100 - LEVEL_PERCENTILE], axis=0)
+    gain = (high - low) / (colors[-1] - colors[0])
+    if np.all(gain >= MIN_CALIBRATION_GAIN):
+        stretched = fit_levels(cell_means, colors, gain, low - gain * colors[0])
+        # A frame using only some of the levels fits either way; keep the nominal reading then
+        if stretched is not None and (best is None or stretched[2] < best[2] / 2):
+            best = stretched
+    if best is None:
+        return nominal
+    return best[:2]
+
+
+def sample_frame_bits(frame, plan):
+    """Returns the bits carried by one (H, W) grayscale or (H, W, 3) RGB frame, row by row.
+
+    The frame may have any size; cell positions are scaled from the plan geometry (see
+    cell_sample_indices). Each cell (and channel) is read as the mean of its central
+    pixels, then snapped to the nearest level after fitting the frame's own black,
+    white and in-between levels (see calibrate_levels).
+    """
+    grid_rows = plan["grid_rows"]
+    grid_cols = plan["grid_cols"]
+    pixel_size = plan["pixel_size"]
+    bits_per_cell = plan["bits_per_cell"]
+    channels = plan["channels"]
+    height, width = frame.shape[:2]
+    if height < grid_rows or width < grid_cols:
+        raise ValueError(f"A {width}x{height} frame is too small for a {grid_cols}x{grid_rows} grid")
+
+    rows, row_samples = cell_sample_indices(height, grid_rows, pixel_size, plan["frame_height"])
+    cols, col_samples = cell_sample_indices(width, grid_cols, pixel_size, plan["frame_width"])
+    grid_pixels = frame[rows][:, cols]
+    if row_samples == col_samples == 1:
+        cell_means = grid_pixels.reshape(-1, channels)
+    else:
+        # Summing one axis at a time is several times faster than mean(axis=(1, 3))
+        cell_sums = grid_pixels.reshape(grid_rows, row_samples, grid_cols, col_samples, channels).sum(
+            axis=3, dtype=np.float32).sum(axis=1)
+        cell_means = cell_sums.reshape(-1, channels) / (row_samples * col_samples)
+
+    colors = level_colors(plan).astype(np.float64)
+    gain, offset = calibrate_levels(cell_means, colors)
+    # Decision points between neighbouring levels, moved onto this frame's scale
+    points = ((colors[:-1] + colors[1:]) / 2)[:, None] * gain + offset
+    levels = np.empty(cell_means.shape, dtype=np.uint8)
+    for channel in range(channels):
+        if cell_means.dtype == np.uint8: # One pixel per cell: look every possible value up once
+            lookup = np.searchsorted(points[:, channel], np.arange(256), side='left').astype(np.uint8)
+            levels[:, channel] = lookup[cell_means[:, channel]]
+        else:
+            levels[:, channel] = np.searchsorted(points[:, channel], cell_means[:, channel], side='left')
+    levels = levels.ravel()
+    gray_code = levels ^ (levels >> 1)
+    shifts = np.arange(bits_per_cell - 1, -1, -1, dtype=np.uint8)
+    return ((gray_code[:, None] >> shifts) & 1).astype(np.uint8).ravel()
@@ -0,0 +1,90 @@
+"""Thread-safe hand-off of status lines, progress and GUI calls from worker threads
+to the Tk main loop.
+
+Tk widgets may only be touched from the main thread, and scheduling one
+root.after(0, ...) per status line floods the event loop when frames are flying by.
+Worker threads post to a GuiEventQueue instead, which costs a queue put (a dict
+store for progress). The main loop drains it on a single periodic after() timer:
+the status lines of a tick are shown with one call, only the latest progress is
+shown, and posted calls run in the order they were posted. Nothing here imports
+tkinter; the queue only needs the root window's after().
+"""
+import queue
+import threading
+import time
+
+DRAIN_INTERVAL_MS = 50 # How often the main loop drains the queue
+MAX_EVENTS_PER_DRAIN = 5000 # Keeps one tick short if the workers flood the queue
+
+_STATUS = 0
+_CALL = 1
+
+
+class GuiEventQueue:
+    """Carries events from any thread to the Tk main loop.
+
+    show_status_lines(entries) gets the (timestamp, message) pairs posted since the
+    last tick; show_progress(message, done, total) gets the latest progress, if any
+    was posted since the last tick.
+    """
+
+    def __init__(self, root, show_status_lines, show_progress=None, interval_ms=DRAIN_INTERVAL_MS):
+        self.root = root
+        self.show_status_lines = show_status_lines
+        self.show_progress = show_progress
+        self.interval_ms = interval_ms
+        self._events = queue.SimpleQueue()
+        self._progress_lock = threading.Lock()
+        self._latest_progress = None # (message, done, total) not shown yet
+        self._timer = None
+
+    def status(self, message):
+        """Posts a status line. Safe from any thread."""
+        self._events.put((_STATUS, (time.time(), message)))
+
+    def progress(self, message, done, total=None):
+        """Posts progress; only the latest of a tick is shown. Safe from any thread."""
+        with self._progress_lock:
+            self._latest_progress = (message, done, total)
+
+    def call(self, function, *args):
+        """Runs function(*args) on the main loop at the next tick. Safe from any thread."""
+        self._events.put((_CALL, (function, args)))
+
+    def start(self):
+        """Starts the drain timer. Call from the main thread."""
+        if self._timer is None:
+            self._timer = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        """Stops the drain timer; events posted later wait for the next start()."""
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+
+    def _drain(self):
+        """Main loop: shows everything posted since the last tick, then re-arms the timer."""
+        try:
+            entries = []
+            for _ in range(MAX_EVENTS_PER_DRAIN):
+                try:
+                    kind, payload = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == _STATUS:
+                    entries.append(payload)
+                    continue
+                if entries: # Keep status lines and calls in the order they were posted
+                    self.show_status_lines(entries)
+                    entries = []
+                function, args = payload
+                function(*args)
+            if entries:
+                self.show_status_lines(entries)
+
+            with self._progress_lock:
+                progress, self._latest_progress = self._latest_progress, None
+            if progress is not None and self.show_progress:
+                self.show_progress(*progress)
+        finally:
+            self._timer = self.root.after(self.interval_ms, self._drain)
@@ -0,0 +1,196 @@
+"""Structured timings and counters for the encode/decode pipelines.
+
+The step functions of encoder_core and decoder_core are wrapped with @timed_stage,
+and the frame streams between them with timed_iterator. Each finished stage emits one
+"stage" event to event_callback: a dict such as
+
+    {"event": "stage", "stage": "step5", "seconds": 1.92, "frames": 240, "bytes_written": 51234, ...}
+
+Counters (frames, bits, bytes written, frames skipped...) are added by the running
+stage with add_counters. A stage that pulls frames from another includes its time:
+step5 includes step4 and step9 includes step8_frames, which are also reported on
+their own. While event_callback is None nothing is measured, so the pipelines pay
+one check per step.
+
+    import instrumentation
+    instrumentation.event_callback = instrumentation.JsonLinesWriter('metrics.jsonl')
+
+The GUIs do the same when $TEXT_VIDEO_METRICS names a file. capture() brackets a
+whole run with "run_start"/"run_end" events and can add a cProfile dump and a
+tracemalloc summary.
+"""
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+METRICS_ENV = 'TEXT_VIDEO_METRICS' # JSON-lines metrics file for the GUIs ('-' = stderr)
+TRACEMALLOC_TOP = 10 # Allocation sites listed in a run_end event with trace_memory
+
+# Called with every event dict (None = instrumentation off)
+event_callback = None
+
+# Per thread: the counter dicts of the stages running in it, innermost last
+_local = threading.local()
+
+
+def emit(event, **fields):
+    """Passes an event to event_callback, if one is set."""
+    if event_callback:
+        event_callback({"event": event, "time": round(time.time(), 3), "thread": threading.current_thread().name,
+                        **fields})
+
+
+def _running_stages():
+    stages = getattr(_local, 'stages', None)
+    if stages is None:
+        stages = _local.stages = []
+    return stages
+
+
+def add_counters(**counters):
+    """Adds counters to the innermost stage running in this thread (nothing if none is)."""
+    stages = getattr(_local, 'stages', None)
+    if stages:
+        totals = stages[-1]
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+
+
+def _failed(result):
+    """Step functions report failure by returning None, or a tuple holding None or False."""
+    return result is None or (isinstance(result, tuple) and any(
+        item is None or item is False for item in result))
+
+
+def timed_stage(name):
+    """Decorator: times each call of a step function and emits a "stage" event with
+    its counters, and "ok": False when the step returned its failure value."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if event_callback is None:
+                return function(*args, **kwargs)
+            stages = _running_stages()
+            counters = {}
+            stages.append(counters)
+            fields = {}
+            started = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+                fields["ok"] = not _failed(result)
+                return result
+            except Exception as e:
+                fields.update(ok=False, error=f"{type(e).__name__}: {e}")
+                raise
+            finally:
+                seconds = time.perf_counter() - started
+                stages.pop()
+                emit("stage", stage=name, seconds=round(seconds, 6), **counters, **fields)
+        return wrapper
+    return decorate
+
+
+def timed_iterator(name, iterable, item_counter='frames'):
+    """Wraps a frame stream so the time spent producing its items is reported as
+    stage name once it is exhausted or closed. Counters added inside the stream go
+    to this stage; item_counter counts the items."""
+    if event_callback is None:
+        return iter(iterable)
+    return _timed_iterator(name, iter(iterable), item_counter)
+
+
+def _timed_iterator(name, iterator, item_counter):
+    counters = {item_counter: 0}
+    seconds = 0.0
+    try:
+        while True:
+            stages = _running_stages()
+            stages.append(counters)
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - started
+                stages.pop()
+            counters[item_counter] += 1
+            yield item
+    finally:
+        emit("stage", stage=name, seconds=round(seconds, 6), **counters)
+
+
+@contextmanager
+def capture(run, cprofile_path=None, trace_memory=False, **fields):
+    """Emits "run_start" and "run_end" events around a whole pipeline run.
+
+    cprofile_path writes cProfile statistics of the calling thread to that file (for
+    pstats or snakeviz). trace_memory adds the tracemalloc peak and the top
+    allocation sites to run_end. Extra fields are copied into both events.
+    """
+    emit("run_start", run=run, **fields)
+    profiler = cProfile.Profile() if cprofile_path else None
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    end_fields = {}
+    started = time.perf_counter()
+    try:
+        yield
+        end_fields["ok"] = True
+    except BaseException as e:
+        end_fields.update(ok=False, error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        end_fields["seconds"] = round(time.perf_counter() - started, 6)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            end_fields["cprofile"] = cprofile_path
+        if trace_memory:
+            end_fields["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            statistics = tracemalloc.take_snapshot().statistics('lineno')[:TRACEMALLOC_TOP]
+            end_fields["tracemalloc_top"] = [{"site": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+                                             for stat in statistics]
+            if started_tracing:
+                tracemalloc.stop()
+        emit("run_end", run=run, **fields, **end_fields)
+
+
+class JsonLinesWriter:
+    """An event_callback that appends each event as one JSON line to a file ('-' =
+    stderr). Safe to call from several threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = sys.stderr if path == '-' else open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stderr:
+            self._file.close()
+
+
+def configure_from_environment():
+    """Points event_callback at a JsonLinesWriter for $TEXT_VIDEO_METRICS if it is
+    set. Returns the writer, or None."""
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return None
+    global event_callback
+    event_callback = JsonLinesWriter(path)
+    return event_callback
@@ -0,0 +1,445 @@
+"""Local job server: encode/decode over HTTP without starting a process per document.
+
+    python job_server.py --port 8765 --jobs 4
+    python job_server.py --unix /tmp/text_video.sock
+
+    curl --data-binary @notes.txt 'http://127.0.0.1:8765/encode?profile=hd&wait=1' -o notes.mp4
+    curl --data-binary @notes.mp4 'http://127.0.0.1:8765/decode?wait=1' -o notes.txt
+    curl --data-binary @big.log 'http://127.0.0.1:8765/encode?compress=zlib'   # -> {"id": ..., "status": "queued"}
+    curl http://127.0.0.1:8765/jobs/<id>
+    curl http://127.0.0.1:8765/jobs/<id>/result -o big.mp4
+    curl -X DELETE http://127.0.0.1:8765/jobs/<id>
+
+An asyncio loop accepts connections and streams each request body to a spool file,
+so uploads never sit in memory. The pipeline itself (text_video.encode/decode over
+encoder_core and decoder_core) runs on a pool of worker processes that are started
+once, so a job pays no interpreter or import startup. At most --jobs jobs run at a
+time; the rest wait as "queued". Results stay on disk until deleted, up to
+MAX_FINISHED_JOBS finished jobs.
+
+Encode options are query parameters: profile, fps, fec, interleave, compress, codec,
+speed, gop. Decode takes range=START:END. Encrypted jobs pass the password in an
+X-Text-Video-Password header. wait=1 answers with the result instead of the job
+record. The server speaks just enough HTTP/1.1 for this (Content-Length or chunked
+bodies, one request per connection) and listens on localhost only by default.
+"""
+import argparse
+import asyncio
+import json
+import mimetypes
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import decoder_core
+import encoder_core
+import fec
+import text_video
+from compression import CODECS
+from frame_profile import DEFAULT_PROFILE, PROFILES
+from video_codecs import DEFAULT_CODEC, SPEED_PRESETS, VIDEO_CODECS
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+BODY_CHUNK_BYTES = 1 << 20 # Bytes read from a request body / result file at a time
+MAX_FINISHED_JOBS = 100 # Finished jobs (and their result files) kept for GET /jobs/<id>/result
+PASSWORD_HEADER = 'x-text-video-password'
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """Aborts a request with an HTTP status and a JSON error message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def init_worker():
+    """Worker process initializer: the pipeline runs silently in the workers."""
+    encoder_core.status_callback = None
+    decoder_core.status_callback = None
+
+
+def run_job(op, input_path, output_path, options, password=None):
+    """Runs one encode or decode job in a worker process and returns the result path.
+
+    Top-level so it can be pickled to the pool. Each job uses a single pipeline
+    worker; the parallelism comes from running jobs side by side.
+    """
+    if op == 'encode':
+        return text_video.encode(input_path, output_path, num_workers=1, password=password, **options)
+    data = text_video.decode(input_path, num_workers=1, byte_range=options.get("byte_range"), password=password)
+    with open(output_path, 'wb') as f_out:
+        f_out.write(data)
+    return output_path
+
+
+def parse_flag(value):
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def encode_options(query):
+    """Maps /encode query parameters to text_video.encode keyword arguments. Raises
+    HttpError(400) for unknown values."""
+    def choice(name, choices, default=None):
+        value = query.get(name, default)
+        if value is not None and value not in choices:
+            raise HttpError(400, f"Unknown {name} '{value}'. Choose from: {', '.join(sorted(choices))}")
+        return value
+
+    try:
+        gop_size = int(query["gop"]) if "gop" in query else None
+        return {
+            "profile": choice("profile", PROFILES, DEFAULT_PROFILE),
+            "fps": int(query.get("fps", encoder_core.DEFAULT_FPS)),
+            "error_correction": parse_flag(query.get("fec", "")),
+            "interleave_frames": int(query.get("interleave", fec.DEFAULT_INTERLEAVE_FRAMES)),
+            "compress": choice("compress", CODECS),
+            "codec": choice("codec", VIDEO_CODECS, DEFAULT_CODEC),
+            "writer_options": {"speed": choice("speed", SPEED_PRESETS), "gop_size": gop_size},
+        }
+    except ValueError as e:
+        raise HttpError(400, f"Bad number in query: {e}")
+
+
+def decode_options(query):
+    """Maps /decode query parameters to run_job options."""
+    if "range" not in query:
+        return {}
+    try:
+        return {"byte_range": text_video.parse_byte_range(query["range"])}
+    except argparse.ArgumentTypeError as e:
+        raise HttpError(400, str(e))
+
+
+class Job:
+    """One submitted encode or decode job and where its files live."""
+
+    def __init__(self, op, work_dir, options, password):
+        self.id = uuid.uuid4().hex
+        self.op = op
+        self.options = options
+        self.password = password
+        self.status = 'queued' # -> running -> done | error
+        self.error = None
+        self.created = time.time()
+        self.seconds = None
+        self.input_bytes = 0
+        self.output_bytes = None
+        self.input_path = os.path.join(work_dir, self.id + '.in')
+        self.output_path = os.path.join(work_dir, self.id + ('.mp4' if op == 'encode' else '.out'))
+        self.task = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'error')
+
+    def record(self):
+        """The job's public status record (no paths, no password)."""
+        return {"id": self.id, "op": self.op, "status": self.status, "error": self.error,
+                "created": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.created)),
+                "seconds": self.seconds, "input_bytes": self.input_bytes, "output_bytes": self.output_bytes}
+
+    def remove_files(self):
+        for path in (self.input_path, self.output_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class JobServer:
+    """Accepts jobs over HTTP and runs them on a pool of max_jobs worker processes."""
+
+    def __init__(self, work_dir, max_jobs=None, log=None):
+        self.work_dir = work_dir
+        self.max_jobs = max_jobs or os.cpu_count() or 1
+        self.log = log
+        self.jobs = OrderedDict()
+        # spawn: forking a process that runs an event loop and I/O threads is not safe
+        self.executor = ProcessPoolExecutor(max_workers=self.max_jobs, initializer=init_worker,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        self._slots = None
+
+    async def warm_up(self):
+        """Starts the worker processes (and their pipeline imports) before the first job."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, os.getpid) for _ in range(self.max_jobs)))
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Jobs ---
+
+    async def run(self, job):
+        """Waits for a free slot, runs the job in a worker process and records the outcome."""
+        async with self._slots:
+            job.status = 'running'
+            started = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                job.output_path = await loop.run_in_executor(self.executor, run_job, job.op, job.input_path,
+                                                             job.output_path, job.options, job.password)
+                job.output_bytes = os.path.getsize(job.output_path)
+                job.status = 'done'
+            except Exception as e:
+                job.status = 'error'
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                job.seconds = round(time.perf_counter() - started, 4)
+                job.password = None
+                if os.path.exists(job.input_path):
+                    os.remove(job.input_path)
+        if self.log:
+            self.log(f"{job.op} {job.id} {job.status} in {job.seconds}s" + (f": {job.error}" if job.error else ""))
+        self.prune()
+
+    def prune(self):
+        """Forgets the oldest finished jobs beyond MAX_FINISHED_JOBS and deletes their files."""
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            job.remove_files()
+            del self.jobs[job.id]
+
+    def get_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HttpError(404, f"No job '{job_id}'")
+        return job
+
+    # --- HTTP ---
+
+    async def handle_connection(self, reader, writer):
+        """Serves one request per connection."""
+        try:
+            request = await read_request_head(reader)
+            if request is not None:
+                await self.handle_request(reader, writer, *request)
+        except HttpError as e:
+            await send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # The client went away
+        except Exception as e:
+            if self.log:
+                self.log(f"Error handling request: {type(e).__name__}: {e}")
+            try:
+                await send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, reader, writer, method, target, headers):
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts in (['encode'], ['decode']):
+            if method != 'POST':
+                raise HttpError(405, f"Use POST for /{parts[0]}")
+            options = encode_options(query) if parts[0] == 'encode' else decode_options(query)
+            job = Job(parts[0], self.work_dir, options, headers.get(PASSWORD_HEADER))
+            if headers.get('expect', '').lower() == '100-continue':
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            job.input_bytes = await spool_body(reader, headers, job.input_path)
+            self.jobs[job.id] = job
+            job.task = asyncio.create_task(self.run(job))
+            if parse_flag(query.get("wait", "")):
+                await job.task
+                await self.send_result(writer, job)
+            else:
+                await send_json(writer, 202, job.record())
+        elif parts == ['jobs'] and method == 'GET':
+            await send_json(writer, 200, {"jobs": [job.record() for job in self.jobs.values()]})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.get_job(parts[1])
+            if method == 'GET':
+                await send_json(writer, 200, job.record())
+            elif method == 'DELETE':
+                if not job.finished:
+                    raise HttpError(409, f"Job is {job.status}; it can be deleted once it has finished")
+                job.remove_files()
+                del self.jobs[job.id]
+                await send_json(writer, 200, job.record())
+            else:
+                raise HttpError(405, "Use GET or DELETE for /jobs/<id>")
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'result' and method == 'GET':
+            await self.send_result(writer, self.get_job(parts[1]))
+        else:
+            raise HttpError(404, f"No route for {method} {url.path}")
+
+    async def send_result(self, writer, job):
+        if job.status == 'error':
+            raise HttpError(500, job.error)
+        if job.status != 'done':
+            raise HttpError(409, f"Job is {job.status}")
+        content_type = 'application/octet-stream'
+        if job.op == 'encode':
+            content_type = mimetypes.guess_type(job.output_path)[0] or content_type
+        await send_file(writer, job.output_path, content_type, {"X-Job-Id": job.id})
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """Runs the server until SIGINT or SIGTERM."""
+        self._slots = asyncio.Semaphore(self.max_jobs)
+        await self.warm_up()
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+            where = unix_path
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            where = f"http://{host}:{port}"
+        if self.log:
+            self.log(f"Serving on {where} with {self.max_jobs} worker process(es); jobs in {self.work_dir}")
+        stopped = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal_number, stopped.set)
+            except NotImplementedError: # Windows: Ctrl+C still raises KeyboardInterrupt
+                pass
+        async with server:
+            await stopped.wait()
+        if self.log:
+            self.log("Shutting down.")
+
+
+async def read_request_head(reader):
+    """Reads the request line and headers. Returns (method, target, headers) with
+    lower-case header names, or None if the client closed the connection first."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, headers
+
+
+async def iter_body(reader, headers):
+    """Yields the request body chunk by chunk (Content-Length or chunked encoding)."""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            try:
+                size = int((await reader.readline()).split(b';')[0], 16)
+            except ValueError:
+                raise HttpError(400, "Malformed chunked body")
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass # Trailers
+                return
+            remaining = size
+            while remaining:
+                chunk = await reader.read(min(remaining, BODY_CHUNK_BYTES))
+                if not chunk:
+                    raise ConnectionError("Client closed the connection mid-body")
+                remaining -= len(chunk)
+                yield chunk
+            await reader.readexactly(2) # CRLF after each chunk
+        return
+    try:
+        remaining = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HttpError(400, "Bad Content-Length")
+    while remaining > 0:
+        chunk = await reader.read(min(remaining, BODY_CHUNK_BYTES))
+        if not chunk:
+            raise ConnectionError("Client closed the connection mid-body")
+        remaining -= len(chunk)
+        yield chunk
+
+
+async def spool_body(reader, headers, path):
+    """Streams the request body into path and returns its length. Raises HttpError(400)
+    for an empty body. If the body cannot be read to the end (the client disconnects,
+    or the server shuts down mid-upload) the partial file is removed: no job owns it
+    yet, so prune would never find it."""
+    loop = asyncio.get_running_loop()
+    length = 0
+    try:
+        with open(path, 'wb') as spool:
+            async for chunk in iter_body(reader, headers):
+                await loop.run_in_executor(None, spool.write, chunk)
+                length += len(chunk)
+        if length == 0:
+            raise HttpError(400, "Nothing to process: the request body is empty")
+    except BaseException: # Including asyncio.CancelledError
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return length
+
+
+def send_head(writer, status, content_type, content_length, extra_headers=None):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+             f"Content-Length: {content_length}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (extra_headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+
+
+async def send_json(writer, status, document):
+    body = json.dumps(document).encode('utf-8')
+    send_head(writer, status, 'application/json', len(body))
+    writer.write(body)
+    await writer.drain()
+
+
+async def send_file(writer, path, content_type, extra_headers=None):
+    """Streams a file as the response body, BODY_CHUNK_BYTES at a time."""
+    loop = asyncio.get_running_loop()
+    send_head(writer, 200, content_type, os.path.getsize(path), extra_headers)
+    with open(path, 'rb') as f_in:
+        while True:
+            chunk = await loop.run_in_executor(None, f_in.read, BODY_CHUNK_BYTES)
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve encode/decode jobs over HTTP on localhost or a Unix socket.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port (default: %(default)s)")
+    parser.add_argument('--unix', default=None, help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="concurrent jobs (default: one per CPU core)")
+    parser.add_argument('--work-dir', default=None,
+                        help="where uploads and results are kept (default: a temporary directory removed on exit)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't log jobs to stderr")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='text_video_jobs_')
+    os.makedirs(work_dir, exist_ok=True)
+    server = JobServer(work_dir, args.jobs, None if args.quiet else text_video.print_status)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        server.close()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Self-describing header carried in the first frame(s) of every encoded video.
+
+Header frames always use a HEADER_GRID x HEADER_GRID black/white grid stretched over
+the whole frame, so the decoder can read them whatever the payload profile is and
+whatever size the video was scaled to. The header tells the decoder the profile,
+the payload length and its checksum, replacing the old metadata.txt side file.
+
+Layout (big-endian):
+  magic (4s) | version (B) | header_length (H)
+  frame_width (H) | frame_height (H) | pixel_size (B) | bits_per_cell (B) | channels (B)
+  payload_bit_length (Q) | payload_crc32 (I) | extra_length (H) | extra (UTF-8 JSON)
+  header_crc32 (I)
+"""
+import json
+import math
+import struct
+import zlib
+import numpy as np
+from frame_profile import make_plan, rasterize_frames, sample_frame_bits
+
+MAGIC = b"T2VH"
+FORMAT_VERSION = 1
+HEADER_GRID = 16
+HEADER_BYTES_PER_FRAME = HEADER_GRID * HEADER_GRID // 8
+HEADER_SAMPLE_SIZE = HEADER_GRID * 8 # Nominal size of the header sampling plan; frames of any size map onto it
+
+_PREFIX = struct.Struct(">4sBH")
+_FIELDS = struct.Struct(">HHBBBQIH")
+_CRC = struct.Struct(">I")
+
+# Plan used to sample a header frame, whatever its size (the grid is stretched over the whole frame)
+HEADER_SAMPLE_PLAN = make_plan({"frame_width": HEADER_SAMPLE_SIZE, "frame_height": HEADER_SAMPLE_SIZE,
+                                "pixel_size": HEADER_SAMPLE_SIZE // HEADER_GRID, "bits_per_cell": 1})
+
+
+def build_header(plan, payload, extra=None):
+    """Returns the header bytes describing plan and payload.
+
+    extra is an optional JSON-serializable dict for stages that need to record
+    their own parameters.
+    """
+    extra_bytes = json.dumps(extra, separators=(',', ':')).encode('utf-8') if extra else b""
+    fields = _FIELDS.pack(plan["frame_width"], plan["frame_height"], plan["pixel_size"],
+                          plan["bits_per_cell"], plan["channels"], len(payload) * 8,
+                          zlib.crc32(payload), len(extra_bytes)) + extra_bytes
+    header_length = _PREFIX.size + len(fields) + _CRC.size
+    body = _PREFIX.pack(MAGIC, FORMAT_VERSION, header_length) + fields
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def header_frame_count(header_length):
+    """Returns how many header frames a header of header_length bytes occupies."""
+    return math.ceil(header_length / HEADER_BYTES_PER_FRAME)
+
+
+def parse_header_length(first_frame_bytes):
+    """Checks the magic and version at the start of the first header frame and
+    returns the total header length in bytes. Raises ValueError if this is not a header."""
+    magic, version, header_length = _PREFIX.unpack_from(first_frame_bytes)
+    if magic != MAGIC:
+        raise ValueError("No stream header found (bad magic); was this video made by the encoder?")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported stream format version {version} (expected {FORMAT_VERSION})")
+    return header_length
+
+
+def parse_header(header_bytes):
+    """Parses and verifies a complete header. Returns a dict with the payload
+    "profile", "payload_bit_length", "payload_crc32" and "extra" fields.
+    Raises ValueError on a corrupted header."""
+    header_length = parse_header_length(header_bytes)
+    header_bytes = header_bytes[:header_length]
+    body, (stored_crc,) = header_bytes[:-_CRC.size], _CRC.unpack(header_bytes[-_CRC.size:])
+    if zlib.crc32(body) != stored_crc:
+        raise ValueError("Stream header checksum mismatch; the header frames are corrupted")
+
+    (frame_width, frame_height, pixel_size, bits_per_cell, channels,
+     payload_bit_length, payload_crc32, extra_length) = _FIELDS.unpack_from(body, _PREFIX.size)
+    extra_start = _PREFIX.size + _FIELDS.size
+    extra_bytes = body[extra_start : extra_start + extra_length]
+    return {
+        "profile": {"frame_width": frame_width, "frame_height": frame_height, "pixel_size": pixel_size,
+                    "bits_per_cell": bits_per_cell, "channels": channels},
+        "payload_bit_length": payload_bit_length,
+        "payload_crc32": payload_crc32,
+        "extra": json.loads(extra_bytes) if extra_bytes else {},
+    }
+
+
+def render_header_frames(header_bytes, plan):
+    """Rasterizes the header into frames of the plan's size and channel count."""
+    num_header_frames = header_frame_count(len(header_bytes))
+    padded = np.zeros(num_header_frames * HEADER_BYTES_PER_FRAME, dtype=np.uint8)
+    padded[:len(header_bytes)] = np.frombuffer(header_bytes, dtype=np.uint8)
+    bit_chunks = np.unpackbits(padded).reshape(num_header_frames, HEADER_GRID * HEADER_GRID)
+    grid_frames = rasterize_frames(bit_chunks, make_plan({"frame_width": HEADER_GRID, "frame_height": HEADER_GRID,
+                                                          "pixel_size": 1, "bits_per_cell": 1}))
+
+    # Stretch the grid over the whole frame, whatever its aspect ratio
+    row_cells = np.arange(plan["frame_height"]) * HEADER_GRID // plan["frame_height"]
+    col_cells = np.arange(plan["frame_width"]) * HEADER_GRID // plan["frame_width"]
+    frames = grid_frames[:, row_cells[:, None], col_cells[None, :]]
+    if plan["channels"] == 3:
+        frames = np.repeat(frames[..., None], 3, axis=3)
+    return frames
+
+
+def decode_header_frame(frame_gray):
+    """Returns the HEADER_BYTES_PER_FRAME bytes carried by one header frame that has
+    already been converted to grayscale. The frame may have any size."""
+    return np.packbits(sample_frame_bits(frame_gray, HEADER_SAMPLE_PLAN)).tobytes()
@@ -0,0 +1,91 @@
+"""Regression tests for chunked encryption and the payload stage helpers:
+python -m pytest test_encryption.py"""
+import zlib
+import numpy as np
+import pytest
+import decoder_core
+import encoder_core
+import encryption
+
+CHUNK_BYTES = 100 # Small chunks so a short payload spans several of them
+DATA = np.random.default_rng(0).integers(0, 256, 1050, dtype=np.uint8).tobytes()
+
+
+@pytest.fixture(scope='module')
+def sealed():
+    """Returns (params, keys, sealed bytes) for DATA."""
+    params = dict(encryption.new_params(len(DATA)), chunk_bytes=CHUNK_BYTES)
+    keys = encryption.derive_keys("correct horse", params)
+    return params, keys, b"".join(encryption.iter_encrypted_chunks(DATA, params, keys))
+
+
+def test_round_trip(sealed):
+    params, keys, sealed_bytes = sealed
+    assert len(sealed_bytes) == encryption.encrypted_length(params)
+    assert encryption.decrypt(sealed_bytes, params, keys) == DATA
+    assert encryption.decrypt(sealed_bytes, params, keys, num_threads=1) == DATA
+
+
+@pytest.mark.parametrize("start, end", [(0, 1), (0, 1050), (99, 101), (250, 251), (1000, 1050), (1049, 1050)])
+def test_sealed_range_slices(sealed, start, end):
+    params, keys, sealed_bytes = sealed
+    sealed_start, sealed_end, first_chunk, data_offset = encryption.sealed_range(params, start, end)
+    data = encryption.decrypt(sealed_bytes[sealed_start:sealed_end], params, keys, first_chunk)
+    assert data[data_offset : data_offset + end - start] == DATA[start:end]
+
+
+def test_wrong_password_is_rejected(sealed):
+    params, _, sealed_bytes = sealed
+    with pytest.raises(ValueError, match="Authentication failed for chunk 0"):
+        encryption.decrypt(sealed_bytes, params, encryption.derive_keys("wrong horse", params))
+
+
+def test_tampered_chunk_is_rejected(sealed):
+    params, keys, sealed_bytes = sealed
+    tampered = bytearray(sealed_bytes)
+    tampered[3 * (CHUNK_BYTES + encryption.TAG_BYTES) + 7] ^= 1
+    with pytest.raises(ValueError, match="Authentication failed for chunk 3"):
+        encryption.decrypt(bytes(tampered), params, keys)
+
+
+def test_reordered_or_truncated_chunks_are_rejected(sealed):
+    params, keys, sealed_bytes = sealed
+    sealed_chunk_bytes = CHUNK_BYTES + encryption.TAG_BYTES
+    swapped = sealed_bytes[sealed_chunk_bytes : 2 * sealed_chunk_bytes] + sealed_bytes[:sealed_chunk_bytes]
+    with pytest.raises(ValueError, match="chunk 0"):
+        encryption.decrypt(swapped, params, keys, num_threads=1)
+    with pytest.raises(ValueError, match="chunk 10"):
+        encryption.decrypt(sealed_bytes[:-1], params, keys) # The last chunk carries the is_last flag in its tag
+    header = {"extra": {"encryption": params}}
+    assert decoder_core.step10_decrypt(sealed_bytes[:2 * sealed_chunk_bytes], header, "correct horse") is None
+
+
+@pytest.mark.parametrize("compress, password, error_correction",
+                         [(None, None, False), ("zlib", None, False), (None, "pw", False),
+                          (None, None, True), ("lzma", "pw", True)])
+def test_payload_stages_round_trip(compress, password, error_correction):
+    payload = DATA * 600 # Several encryption chunks and error correction blocks
+    staged, header_extra = encoder_core.step2_apply_payload_stages(payload, "dense_gray", compress, password,
+                                                                   error_correction)
+    assert set(header_extra) == ({"compression"} if compress else set()) | \
+                                ({"encryption"} if password else set()) | ({"fec"} if error_correction else set())
+    restored = decoder_core.step10_undo_payload_stages(staged, {"extra": header_extra}, password)
+    assert bytes(restored) == payload
+
+
+def test_payload_stages_reject_wrong_password():
+    staged, header_extra = encoder_core.step2_apply_payload_stages(DATA, "dense_gray", "zlib", "pw", True)
+    assert decoder_core.step10_undo_payload_stages(staged, {"extra": header_extra}, "not pw") is None
+
+
+@pytest.mark.parametrize("compress, error_correction", [("zlib", False), ("bz2", True)])
+def test_encrypted_header_has_no_plaintext_fields(compress, error_correction):
+    """The header is stored in the clear, so nothing in it may let a plaintext guess be
+    checked without the password."""
+    secret = b"PIN 4821"
+    _, header_extra = encoder_core.step2_apply_payload_stages(secret, "dense_gray", compress, "hunter2",
+                                                              error_correction)
+    assert header_extra["compression"] == {"codec": compress}
+    values = [value for params in header_extra.values() for value in params.values()]
+    assert zlib.crc32(secret) not in values
+    assert len(secret) not in [params.get("data_bytes") for params in header_extra.values()]
@@ -0,0 +1,50 @@
+"""Regression tests for the interleaved Hamming(7,4) code: python -m pytest test_fec.py"""
+import numpy as np
+import pytest
+import fec
+
+BLOCK_CODEWORDS = 256 # 128 data bytes, 224 coded bytes per block
+
+
+def random_data(length, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, length, dtype=np.uint8).tobytes()
+
+
+def encode(data, block_codewords=BLOCK_CODEWORDS):
+    return b"".join(fec.iter_encoded_chunks(data, block_codewords))
+
+
+@pytest.mark.parametrize("length", [1, 127, 128, 1000, 5 * 128])
+def test_round_trip(length):
+    data = random_data(length)
+    coded = encode(data)
+    assert len(coded) == fec.coded_length(length, BLOCK_CODEWORDS)
+    assert fec.decode(coded, BLOCK_CODEWORDS, length) == (data, 0)
+
+
+@pytest.mark.parametrize("burst_start, burst_bits", [(0, BLOCK_CODEWORDS), (1000, 100), (3 * 224 * 8 + 5, 200)])
+def test_corrects_burst(burst_start, burst_bits):
+    """Interleaving spreads a burst of up to block_codewords consecutive coded bits over
+    distinct codewords, so every flipped bit is corrected."""
+    data = random_data(1000)
+    coded_bits = np.unpackbits(np.frombuffer(encode(data), dtype=np.uint8))
+    coded_bits[burst_start : burst_start + burst_bits] ^= 1
+    assert fec.decode(np.packbits(coded_bits).tobytes(), BLOCK_CODEWORDS, len(data)) == (data, burst_bits)
+
+
+def test_uninterleaved_burst_is_not_corrected():
+    data = random_data(1000)
+    coded_bits = np.unpackbits(np.frombuffer(encode(data), dtype=np.uint8))
+    coded_bits[[0, BLOCK_CODEWORDS]] ^= 1 # Two bits of the same codeword
+    decoded, _ = fec.decode(np.packbits(coded_bits).tobytes(), BLOCK_CODEWORDS, len(data))
+    assert decoded != data
+
+
+@pytest.mark.parametrize("start, end", [(0, 1), (0, 1000), (127, 129), (300, 301), (500, 1000), (999, 1000)])
+def test_coded_range_slices(start, end):
+    data = random_data(1000)
+    coded = encode(data)
+    params = fec.fec_params(data, BLOCK_CODEWORDS)
+    coded_start, coded_end, data_offset = fec.coded_range(params, start, end)
+    decoded, _ = fec.decode(coded[coded_start:coded_end], BLOCK_CODEWORDS)
+    assert decoded[data_offset : data_offset + end - start] == data[start:end]
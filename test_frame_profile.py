@@ -0,0 +1,39 @@
+"""Regression tests for rasterizing and sampling frames: python -m pytest test_frame_profile.py"""
+import cv2
+import numpy as np
+import pytest
+from frame_profile import PROFILES, make_plan, rasterize_frames, sample_frame_bits
+
+
+def random_frame(profile, seed=0):
+    """Returns (bits, frame) for one frame of random bits."""
+    plan = make_plan(PROFILES[profile])
+    bits = np.random.default_rng(seed).integers(0, 2, (1, plan["bits_per_frame"]), dtype=np.uint8)
+    return plan, bits[0], rasterize_frames(bits, plan)[0]
+
+
+@pytest.mark.parametrize("profile", ["classic", "dense_gray", "hd_gray", "classic_rgb", "hd_lossless"])
+def test_exact_frame_round_trip(profile):
+    plan, bits, frame = random_frame(profile)
+    assert frame.shape[:2] == (plan["frame_height"], plan["frame_width"])
+    assert np.array_equal(sample_frame_bits(frame, plan), bits)
+
+
+@pytest.mark.parametrize("size", [(160, 120), (640, 480), (333, 251)])
+def test_rescaled_frame(size):
+    plan, bits, frame = random_frame("dense_gray")
+    assert np.array_equal(sample_frame_bits(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), plan), bits)
+
+
+def test_limited_range_noisy_frame():
+    """Levels squeezed into 16-235 video range, plus noise, are recovered by per-frame calibration."""
+    plan, bits, frame = random_frame("hd_gray")
+    noise = np.random.default_rng(1).normal(0, 6, frame.shape)
+    limited = np.clip(16 + frame * (219 / 255) + noise, 0, 255).astype(np.uint8)
+    assert np.array_equal(sample_frame_bits(limited, plan), bits)
+
+
+def test_frame_too_small_for_grid():
+    plan, _, frame = random_frame("dense_gray")
+    with pytest.raises(ValueError, match="too small"):
+        sample_frame_bits(frame[:10, :10], plan)
@@ -0,0 +1,46 @@
+"""Regression tests for the stream header: python -m pytest test_stream_header.py"""
+import zlib
+import numpy as np
+import pytest
+from frame_profile import PROFILES, make_plan
+from stream_header import (HEADER_BYTES_PER_FRAME, build_header, decode_header_frame, header_frame_count,
+                           parse_header, parse_header_length, render_header_frames)
+
+PAYLOAD = bytes(range(256)) * 40
+EXTRA = {"compression": {"codec": "zlib", "data_bytes": 12345},
+         "fec": {"scheme": "hamming74", "block_codewords": 4096, "data_bytes": 12345, "data_crc32": 1}}
+
+
+def test_header_round_trip():
+    plan = make_plan(PROFILES["hd_gray"])
+    header = parse_header(build_header(plan, PAYLOAD, EXTRA))
+    assert header["profile"] == {key: plan[key] for key in header["profile"]}
+    assert header["payload_bit_length"] == len(PAYLOAD) * 8
+    assert header["payload_crc32"] == zlib.crc32(PAYLOAD)
+    assert header["extra"] == EXTRA
+
+
+@pytest.mark.parametrize("profile", ["classic", "dense_gray", "hd_rgb"])
+def test_header_round_trip_through_frames(profile):
+    plan = make_plan(PROFILES[profile])
+    header_bytes = build_header(plan, PAYLOAD, EXTRA)
+    frames = render_header_frames(header_bytes, plan)
+    assert len(frames) == header_frame_count(len(header_bytes))
+
+    decoded = b"".join(decode_header_frame(frame if frame.ndim == 2 else frame[..., 0]) for frame in frames)
+    assert len(decoded) == len(frames) * HEADER_BYTES_PER_FRAME
+    assert parse_header_length(decoded) == len(header_bytes)
+    assert parse_header(decoded)["extra"] == EXTRA
+
+
+@pytest.mark.parametrize("position", [7, 20, -3])
+def test_corrupted_header_is_rejected(position):
+    header_bytes = bytearray(build_header(make_plan(PROFILES["hd"]), PAYLOAD, EXTRA))
+    header_bytes[position] ^= 0x10
+    with pytest.raises(ValueError, match="checksum mismatch"):
+        parse_header(bytes(header_bytes))
+
+
+def test_non_header_frame_is_rejected():
+    with pytest.raises(ValueError, match="bad magic"):
+        parse_header_length(np.zeros(HEADER_BYTES_PER_FRAME, dtype=np.uint8).tobytes())
@@ -0,0 +1,257 @@
+"""Headless encode/decode API and command line, for running without a display.
+
+    python text_video.py encode notes.txt -o notes.mp4 --profile hd
+    python text_video.py encode notes.txt -o notes.mp4 --profile hd_gray --fec
+    python text_video.py encode app.log -o app.mp4 --compress lzma
+    python text_video.py encode notes.txt -o notes.mp4 --encrypt
+    python text_video.py decode notes.mp4 -o notes.txt --decrypt
+    python text_video.py encode notes.txt -o notes.mkv --profile hd_lossless --codec ffv1
+    python text_video.py decode notes.mp4 -o notes.txt
+    python text_video.py decode notes.mp4 --range 0:1024
+    python text_video.py --metrics metrics.jsonl --cprofile encode.prof encode big.log -o big.mp4
+
+From Python:
+
+    import text_video
+    text_video.encode(b"hello", "hello.mp4")
+    text_video.decode("hello.mp4")  # -> b"hello"
+
+This module never imports tkinter.
+"""
+import argparse
+import getpass
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import time
+import decoder_core
+import encoder_core
+import encryption
+import fec
+import instrumentation
+from compression import CODECS
+from frame_profile import DEFAULT_PROFILE, PROFILES
+from video_codecs import DEFAULT_CODEC, SPEED_PRESETS, VIDEO_CODECS
+
+STREAM_CHUNK_SIZE = 1 << 20 # Bytes copied at a time when spooling a stream
+
+
+def encode(source, output_video=encoder_core.DEFAULT_OUTPUT_VIDEO, profile=DEFAULT_PROFILE,
+           num_workers=None, fps=encoder_core.DEFAULT_FPS, error_correction=False,
+           interleave_frames=fec.DEFAULT_INTERLEAVE_FRAMES, compress=None, password=None,
+           codec=DEFAULT_CODEC, writer_options=None):
+    """Encodes source (bytes, or the path of a file to read) into a video.
+
+    Files are streamed through a memory map rather than read into memory, so their
+    size is not limited by RAM. compress names a compression.CODECS codec applied
+    first; a password then encrypts and authenticates the payload.
+    error_correction=True adds Hamming(7,4) codes interleaved across
+    interleave_frames frames, so dense profiles survive lossy compression. codec
+    and writer_options (speed, gop_size, pixel_format) are passed to step5.
+
+    Returns the video path, whose extension step5 may have changed to suit the
+    codec. Raises RuntimeError if a pipeline step fails; the step's reason is
+    reported through encoder_core.status_callback.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        if not source:
+            raise ValueError("Nothing to encode: the input is empty")
+        payload, _ = encoder_core.step2_convert_to_binary(bytes(source))
+    else:
+        if os.path.getsize(source) == 0:
+            raise ValueError("Nothing to encode: the input is empty")
+        payload, _ = encoder_core.step2_map_input_file(source)
+    if payload is None:
+        raise RuntimeError("Reading the input failed")
+
+    try:
+        staged_payload, header_extra = encoder_core.step2_apply_payload_stages(
+            payload, profile, compress, password, error_correction, interleave_frames)
+        if staged_payload is None:
+            raise RuntimeError("Compressing, encrypting or error-correcting the payload failed")
+        payload = staged_payload
+        plan = encoder_core.step3_plan_visual_representation(payload, profile, header_extra)
+        if plan is None:
+            raise RuntimeError("Planning the visual representation failed")
+        frames = encoder_core.step4_generate_frames(payload, plan, num_workers)
+        video_filename = encoder_core.step5_compile_video(plan, frames, output_video, fps, codec,
+                                                          **(writer_options or {}))
+    finally:
+        if isinstance(payload, mmap.mmap):
+            payload.close()
+    if video_filename is None:
+        raise RuntimeError("Video compilation failed")
+    return video_filename
+
+
+def encode_stream(stream, output_video=encoder_core.DEFAULT_OUTPUT_VIDEO, profile=DEFAULT_PROFILE,
+                  num_workers=None, fps=encoder_core.DEFAULT_FPS, error_correction=False,
+                  interleave_frames=fec.DEFAULT_INTERLEAVE_FRAMES, compress=None, password=None,
+                  codec=DEFAULT_CODEC, writer_options=None):
+    """Encodes a binary stream of unknown length (e.g. stdin) into a video.
+
+    The header needs the payload length and checksum before the first frame, so the
+    stream is first spooled to a temporary file in chunks and then encoded from there.
+    """
+    with tempfile.NamedTemporaryFile(prefix='text_video_input_', delete=False) as spool:
+        shutil.copyfileobj(stream, spool, STREAM_CHUNK_SIZE)
+    try:
+        return encode(spool.name, output_video, profile, num_workers, fps, error_correction, interleave_frames,
+                      compress, password, codec, writer_options)
+    finally:
+        os.remove(spool.name)
+
+
+def decode(video_path, num_workers=None, byte_range=None, password=None):
+    """Decodes the payload carried by video_path and returns it as bytes.
+
+    byte_range=(start, end) decodes only those payload bytes, reading just the frames
+    that carry them. password is needed for encrypted videos. Raises RuntimeError if
+    the video cannot be decoded.
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(video_path)
+    if num_workers is None:
+        num_workers = decoder_core.DECODER_WORKERS
+
+    if byte_range is not None:
+        _, data = decoder_core.step9_decode_byte_range(video_path, *byte_range, password)
+        if data is None:
+            raise RuntimeError(f"Decoding bytes {byte_range[0]}-{byte_range[1]} failed")
+        return data
+
+    if num_workers > 1:
+        header, data = decoder_core.step9_decode_segments_parallel(video_path, num_workers)
+    else:
+        extraction_success, header, frames = decoder_core.step8_extract_and_resize_frames(video_path)
+        if not extraction_success:
+            raise RuntimeError("Frame extraction failed")
+        data = decoder_core.step9_decode_frames_to_binary(frames, header)
+    if data is None:
+        raise RuntimeError("Binary decoding failed")
+    if "encryption" in header["extra"] and not password:
+        raise RuntimeError("This video is encrypted; a password is needed (use --decrypt)")
+    data = decoder_core.step10_undo_payload_stages(data, header, password)
+    if data is None:
+        raise RuntimeError("Recovering the payload failed (error correction, decryption or decompression); "
+                           "wrong password or corrupted video?")
+    return data
+
+
+def print_status(message):
+    """Status callback for the command line: timestamped lines on stderr."""
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr)
+
+
+def read_password(confirm=False):
+    """Returns the password from $TEXT_VIDEO_PASSWORD, or prompts for it on the terminal."""
+    password = os.environ.get(encryption.PASSWORD_ENV)
+    if password:
+        return password
+    password = getpass.getpass("Password: ")
+    if confirm and getpass.getpass("Repeat password: ") != password:
+        raise ValueError("Passwords do not match")
+    return password
+
+
+def parse_byte_range(text):
+    """Parses "start:end" into a (start, end) tuple for --range."""
+    start, _, end = text.partition(':')
+    try:
+        return int(start or 0), int(end) if end else sys.maxsize
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START:END byte offsets, got '{text}'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode text into video frames and decode it back, without a GUI.")
+    parser.add_argument('-q', '--quiet', action='store_true', help="don't print status lines to stderr")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU core)")
+    parser.add_argument('--metrics', default=None,
+                        help="append per-stage timings and counters as JSON lines to this file ('-' = stderr)")
+    parser.add_argument('--cprofile', default=None, help="write cProfile statistics of the run to this file")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="report the tracemalloc peak and top allocation sites (with --metrics, else on stderr)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    encode_parser = subparsers.add_parser('encode', help="encode a file into a video")
+    encode_parser.add_argument('input', help="file to encode ('-' reads stdin)")
+    encode_parser.add_argument('-o', '--output', default=encoder_core.DEFAULT_OUTPUT_VIDEO, help="output video path")
+    encode_parser.add_argument('-p', '--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                               help="frame profile (default: %(default)s)")
+    encode_parser.add_argument('--fps', type=int, default=encoder_core.DEFAULT_FPS, help="video frame rate")
+    encode_parser.add_argument('--fec', action='store_true',
+                               help="add Hamming(7,4) error correction interleaved across frames")
+    encode_parser.add_argument('--interleave', type=int, default=fec.DEFAULT_INTERLEAVE_FRAMES,
+                               help="frames each error correction block spans (default: %(default)s)")
+    encode_parser.add_argument('--compress', choices=sorted(CODECS), default=None,
+                               help="compress the input before encoding it")
+    encode_parser.add_argument('-c', '--codec', default=DEFAULT_CODEC, choices=sorted(VIDEO_CODECS),
+                               help="output codec; lossless codecs allow finer profiles (default: %(default)s)")
+    encode_parser.add_argument('--speed', choices=SPEED_PRESETS, default=None,
+                               help="x264 speed preset: faster encodes, bigger files")
+    encode_parser.add_argument('--gop', dest='gop_size', type=int, default=None, help="keyframe interval in frames")
+    encode_parser.add_argument('--pix-fmt', dest='pixel_format', default=None, help="FFmpeg pixel format override")
+    encode_parser.add_argument('--encrypt', action='store_true',
+                               help=f"encrypt with a password (from ${encryption.PASSWORD_ENV} or a prompt)")
+
+    decode_parser = subparsers.add_parser('decode', help="decode a video back into a file")
+    decode_parser.add_argument('input', help="video to decode")
+    decode_parser.add_argument('-o', '--output', default='-', help="output file ('-' writes stdout, the default)")
+    decode_parser.add_argument('--range', dest='byte_range', type=parse_byte_range, default=None,
+                               help="only decode payload bytes START:END")
+    decode_parser.add_argument('--decrypt', action='store_true',
+                               help=f"decrypt with a password (from ${encryption.PASSWORD_ENV} or a prompt)")
+
+    args = parser.parse_args(argv)
+    if not args.quiet:
+        encoder_core.status_callback = print_status
+        decoder_core.status_callback = print_status
+    if args.metrics or args.trace_memory:
+        instrumentation.event_callback = instrumentation.JsonLinesWriter(args.metrics or '-')
+
+    try:
+        with instrumentation.capture(args.command, args.cprofile, args.trace_memory, input=args.input):
+            run_command(args)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if instrumentation.event_callback:
+            instrumentation.event_callback.close()
+            instrumentation.event_callback = None
+    return 0
+
+
+def run_command(args):
+    """Runs the encode or decode subcommand parsed by main."""
+    if args.command == 'encode':
+        password = read_password(confirm=True) if args.encrypt else None
+        writer_options = {"speed": args.speed, "gop_size": args.gop_size, "pixel_format": args.pixel_format}
+        if args.input == '-':
+            video_filename = encode_stream(sys.stdin.buffer, args.output, args.profile, args.workers, args.fps,
+                                           args.fec, args.interleave, args.compress, password, args.codec,
+                                           writer_options)
+        else:
+            video_filename = encode(args.input, args.output, args.profile, args.workers, args.fps,
+                                    args.fec, args.interleave, args.compress, password, args.codec,
+                                    writer_options)
+        if not args.quiet:
+            print_status(f"Video saved as: {video_filename}")
+    else:
+        data = decode(args.input, args.workers, args.byte_range, read_password() if args.decrypt else None)
+        if args.output == '-':
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        else:
+            with open(args.output, 'wb') as f_out:
+                f_out.write(data)
+            if not args.quiet:
+                print_status(f"Decoded {len(data)} bytes to: {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Output codecs for step5 and the matching readers for the decoder.
+
+"h264" is the original lossy libx264 output. The lossless codecs keep every pixel
+exact, so the decoder can use tighter cells (see the "hd_lossless" profile) at the
+cost of larger files. "npy" writes the raw frame array to a NumPy .npy file for
+pipelines that never leave the machine; NpyCapture reads it back through the same
+interface as cv2.VideoCapture.
+"""
+import os
+import cv2
+import imageio
+import numpy as np
+
+VIDEO_CODECS = {
+    # Lossy H.264 at FFmpeg's default quality; frames are resized to multiples of 16
+    "h264": {"codec": "libx264", "extensions": (".mp4", ".mkv", ".avi"), "lossless": False,
+             "pixel_formats": (None, None), "ffmpeg_params": [], "speed_presets": True, "macro_block_size": 16},
+    # H.264 in RGB at -qp 0: lossless, and still tunable with --speed
+    "h264_lossless": {"codec": "libx264rgb", "extensions": (".mkv",), "lossless": True,
+                      "pixel_formats": ("rgb24", "rgb24"), "ffmpeg_params": ["-qp", "0"], "speed_presets": True,
+                      "macro_block_size": 1},
+    # FFV1 intra-frame lossless codec; grayscale profiles are stored as 8-bit gray
+    "ffv1": {"codec": "ffv1", "extensions": (".mkv", ".avi"), "lossless": True,
+             "pixel_formats": ("gray", "bgr0"), "ffmpeg_params": [], "speed_presets": False, "macro_block_size": 1},
+    # Raw uint8 frame array, no compression at all
+    "npy": {"codec": None, "extensions": (".npy",), "lossless": True},
+}
+DEFAULT_CODEC = "h264"
+# x264 speed presets accepted by --speed (faster = bigger files for the same quality)
+SPEED_PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+
+
+def get_codec(codec):
+    """Returns the VIDEO_CODECS entry for codec. Raises ValueError for unknown names."""
+    if codec not in VIDEO_CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Choose from: {', '.join(VIDEO_CODECS)}")
+    return VIDEO_CODECS[codec]
+
+
+def output_path_for(output_video_file, codec):
+    """Returns output_video_file with its extension swapped for the codec's default
+    if the codec cannot be stored in that container."""
+    stem, extension = os.path.splitext(output_video_file)
+    extensions = get_codec(codec)["extensions"]
+    return output_video_file if extension.lower() in extensions else stem + extensions[0]
+
+
+def open_writer(output_video_file, plan, num_frames, fps, codec=DEFAULT_CODEC, speed=None, gop_size=None,
+                pixel_format=None):
+    """Opens a frame writer with append_data(frame) and close() for the codec.
+
+    speed is an x264 preset (SPEED_PRESETS), gop_size the keyframe interval and
+    pixel_format overrides the codec's FFmpeg pixel format. Options a codec has no
+    use for, and a lossless_only plan with a lossy codec, raise ValueError.
+    """
+    entry = get_codec(codec)
+    if plan.get("lossless_only") and not entry["lossless"]:
+        lossless_codecs = [name for name, other in VIDEO_CODECS.items() if other["lossless"]]
+        raise ValueError(f"This profile only decodes from a lossless codec ({', '.join(lossless_codecs)}), "
+                         f"not '{codec}'")
+    if entry["codec"] is None:
+        if speed or gop_size or pixel_format:
+            raise ValueError(f"Codec '{codec}' has no speed, GOP or pixel format options")
+        return NpyFrameWriter(output_video_file, plan, num_frames)
+
+    ffmpeg_params = list(entry["ffmpeg_params"])
+    if speed:
+        if not entry["speed_presets"]:
+            raise ValueError(f"Codec '{codec}' has no speed presets")
+        if speed not in SPEED_PRESETS:
+            raise ValueError(f"Unknown speed preset '{speed}'. Choose from: {', '.join(SPEED_PRESETS)}")
+        ffmpeg_params += ["-preset", speed]
+    if gop_size:
+        ffmpeg_params += ["-g", str(gop_size)]
+    writer_options = {"codec": entry["codec"], "macro_block_size": entry["macro_block_size"],
+                      "ffmpeg_params": ffmpeg_params}
+    pixel_format = pixel_format or entry["pixel_formats"][plan["channels"] == 3]
+    if pixel_format:
+        writer_options["pixelformat"] = pixel_format
+    return imageio.get_writer(output_video_file, fps=fps, format='FFMPEG', mode='I', **writer_options)
+
+
+class NpyFrameWriter:
+    """Writes frames straight into a memory-mapped .npy array of num_frames frames."""
+
+    def __init__(self, output_video_file, plan, num_frames):
+        frame_shape = (plan["frame_height"], plan["frame_width"]) + ((3,) if plan["channels"] == 3 else ())
+        self.frames = np.lib.format.open_memmap(output_video_file, mode='w+', dtype=np.uint8,
+                                                shape=(num_frames,) + frame_shape)
+        self.frames_written = 0
+
+    def append_data(self, frame):
+        self.frames[self.frames_written] = frame
+        self.frames_written += 1
+
+    def close(self):
+        if self.frames is not None:
+            self.frames.flush()
+            self.frames = None
+
+
+class NpyCapture:
+    """The part of the cv2.VideoCapture interface the decoder uses, over a .npy file
+    written by NpyFrameWriter. Frames are returned as BGR, like a real capture."""
+
+    def __init__(self, video_path):
+        try:
+            self.frames = np.load(video_path, mmap_mode='r')
+        except (OSError, ValueError):
+            self.frames = None
+        self.position = 0
+
+    def isOpened(self):
+        return self.frames is not None
+
+    def read(self):
+        if self.frames is None or self.position >= len(self.frames):
+            return False, None
+        frame = np.asarray(self.frames[self.position])
+        self.position += 1
+        return True, cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR if frame.ndim == 2 else cv2.COLOR_RGB2BGR)
+
+    def get(self, property_id):
+        if property_id == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.frames) if self.frames is not None else 0
+        if property_id == cv2.CAP_PROP_POS_FRAMES:
+            return self.position
+        return 0
+
+    def set(self, property_id, value):
+        if property_id != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self.position = int(value)
+        return True
+
+    def release(self):
+        self.frames = None
+
+
+def open_capture(video_path):
+    """Opens video_path for reading: a NpyCapture for .npy files, else cv2.VideoCapture."""
+    if video_path.lower().endswith('.npy'):
+        return NpyCapture(video_path)
+    return cv2.VideoCapture(video_path)
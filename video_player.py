@@ -0,0 +1,201 @@
+"""Lazy video preview playback for the GUIs, in constant memory.
+
+LazyVideoPlayer decodes frames on a background thread into a small bounded buffer
+instead of loading the whole video up front, so opening even a long payload video
+for preview is instant. The GUI asks for the frame that should be on screen now
+(next_frame); frames the GUI is too slow to show are dropped rather than played
+late. ScaledFrameCache keeps the scaled, display-ready images of recent frames so
+looping or repeated frames are not resized and converted again. Nothing here
+imports tkinter; frames come out as RGB uint8 arrays.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from video_codecs import open_capture
+
+PREFETCH_FRAMES = 32 # Decoded frames buffered ahead of playback
+DEFAULT_PLAYBACK_FPS = 10 # Used when the video does not report its frame rate
+SCALED_CACHE_FRAMES = 64 # Display-ready images kept by ScaledFrameCache
+
+
+class LazyVideoPlayer:
+    """Prefetches the frames of one video on a background thread.
+
+    Frames are numbered by a play sequence that starts at the seek position and,
+    with loop=True, keeps counting when the video wraps around to its start. A
+    playback clock started by seek() or restart_clock() says which frame is due.
+    """
+
+    def __init__(self, video_path, buffer_frames=PREFETCH_FRAMES, loop=False, fps=None):
+        capture = open_capture(video_path)
+        if not capture.isOpened():
+            raise IOError(f"Could not open video file: {video_path}")
+        self.fps = fps or capture.get(cv2.CAP_PROP_FPS) or DEFAULT_PLAYBACK_FPS
+        self.frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.loop = loop
+        self.finished = False # Set once the end of a non-looping video has been reached
+        self.frames_dropped = 0
+
+        self._frames = queue.Queue(maxsize=buffer_frames)
+        self._lock = threading.Lock()
+        self._generation = 0 # Bumped by every seek; frames from older generations are stale
+        self._seek_to = None
+        self._pending = None # A frame taken from the buffer before it was due
+        self._clock_origin = 0
+        self._clock_start = time.monotonic()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._prefetch, args=(capture,), daemon=True)
+        self._thread.start()
+
+    def _prefetch(self, capture):
+        """Background thread: reads frames and feeds the buffer until close()."""
+        generation = 0
+        sequence = 0
+        at_end = False
+        try:
+            while not self._stopped.is_set():
+                with self._lock:
+                    if self._seek_to is not None:
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, self._seek_to)
+                        generation, sequence, self._seek_to = self._generation, self._seek_to, None
+                        at_end = False
+                if at_end:
+                    self._stopped.wait(0.05) # Idle until a seek or close()
+                    continue
+
+                success, frame_bgr = capture.read()
+                if not success:
+                    if self.loop and sequence > 0:
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    at_end = True
+                    self._put((generation, sequence, None), generation)
+                    continue
+                frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+                self._put((generation, sequence, frame_rgb), generation)
+                sequence += 1
+        finally:
+            capture.release()
+
+    def _put(self, item, generation):
+        """Blocks until the buffer has room, giving up on close() or a newer seek."""
+        while not self._stopped.is_set() and generation == self._generation:
+            try:
+                self._frames.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                pass
+
+    def _drain(self):
+        try:
+            while True:
+                self._frames.get_nowait()
+        except queue.Empty:
+            pass
+
+    def next_frame(self, sequence):
+        """Returns (sequence, frame) for the frame due at play position sequence,
+        dropping older buffered frames. Returns None if that frame is not due or not
+        decoded yet, or if the video has ended (then finished is set)."""
+        while True:
+            if self._pending is not None:
+                item, self._pending = self._pending, None
+            else:
+                try:
+                    item = self._frames.get_nowait()
+                except queue.Empty:
+                    return None
+            generation, frame_sequence, frame = item
+            if generation != self._generation:
+                continue
+            if frame is None:
+                self.finished = True
+                return None
+            if frame_sequence < sequence:
+                self.frames_dropped += 1
+                continue
+            if frame_sequence > sequence:
+                self._pending = item # Not due yet
+                return None
+            return frame_sequence, frame
+
+    def restart_clock(self, sequence=0):
+        """Makes frame sequence due now, with later frames following at fps."""
+        self._clock_origin = sequence
+        self._clock_start = time.monotonic()
+
+    def due_sequence(self):
+        """Returns the play sequence of the frame that should be on screen now."""
+        return self._clock_origin + int((time.monotonic() - self._clock_start) * self.fps)
+
+    def ms_until_next_frame(self):
+        """Returns the milliseconds until the frame after the current one is due (at least 1)."""
+        next_due = self._clock_start + (self.due_sequence() - self._clock_origin + 1) / self.fps
+        return max(1, int((next_due - time.monotonic()) * 1000))
+
+    def seek(self, frame_index):
+        """Restarts prefetching and the playback clock at frame_index."""
+        frame_index = max(0, int(frame_index))
+        with self._lock:
+            self._generation += 1
+            self._seek_to = frame_index
+            self.finished = False
+        self._pending = None
+        self._drain()
+        self.restart_clock(frame_index)
+
+    def close(self):
+        """Stops the prefetch thread and releases the video."""
+        self._stopped.set()
+        self._drain()
+        self._thread.join(timeout=1)
+
+
+class ScaledFrameCache:
+    """LRU cache of display-ready images, keyed by (frame index, display size).
+
+    render(frame_rgb, size) makes the image (e.g. a resized PhotoImage) on a miss. A
+    frame identical to the one shown just before reuses its image without rendering,
+    so runs of identical frames cost one comparison each.
+    """
+
+    def __init__(self, render, max_entries=SCALED_CACHE_FRAMES):
+        self.render = render
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._last_frame = None
+        self._last_size = None
+        self._last_image = None
+
+    def get(self, frame_index, frame_rgb, size):
+        """Returns (image, changed); changed is False when image is the one returned last,
+        so the caller can leave the display alone."""
+        key = (frame_index, size)
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+            self.hits += 1
+        else:
+            if size == self._last_size and np.array_equal(frame_rgb, self._last_frame):
+                image = self._last_image
+                self.hits += 1
+            else:
+                image = self.render(frame_rgb, size)
+                self.misses += 1
+            self._images[key] = image
+            if len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+
+        changed = image is not self._last_image
+        self._last_frame, self._last_size, self._last_image = frame_rgb, size, image
+        return image, changed
+
+    def clear(self):
+        """Forgets every image, e.g. when another video is opened."""
+        self._images.clear()
+        self._last_frame = self._last_size = self._last_image = None